@@ -0,0 +1,299 @@
+"""Offline throughput benchmark for AutoMod.on_message.
+
+Drives the real cog with stand-in Message/Member/Guild objects over a
+synthetic corpus of clean, toxic, spammy, obfuscated and link messages, for
+several rule-set sizes. Reports messages/sec, p50/p99 listener latency, the
+tracemalloc peak over the run and the bytes each message allocates while it
+is handled (its tracemalloc peak above what was live when it started, p50
+and p99), and writes everything to a JSON file so runs can be compared
+across versions:
+
+    python benchmarks/bench_automod.py --output before.json
+    python benchmarks/bench_automod.py --output after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import string
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from cogs.automod import AutoMod
+
+GUILD_ID = 1000
+LOG_CHANNEL_ID = 2000
+KEYWORD_COUNTS = [0, 10, 1_000, 10_000]
+CORPUS_MIX = {"clean": 0.70, "toxic": 0.10, "spammy": 0.08, "obfuscated": 0.07, "links": 0.05}
+BANNED_WORDS = ["asshole", "scamlord", "freenitro"]
+
+SETTINGS = {
+    "enabled": True,
+    "anticuss": True,
+    "antispam": True,
+    "antiinvite": True,
+    "anticaps": True,
+    "antilinks": False,
+    "antiemoji": True,
+    "antimention": True,
+    "antinewlines": True,
+    "antiimagespam": False,
+    "banned_words": BANNED_WORDS,
+}
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.mention = f"<#{channel_id}>"
+        self.sent = 0
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+
+    async def delete_messages(self, messages, reason=None):
+        pass
+
+
+class FakeGuild:
+    def __init__(self, guild_id, channels):
+        self.id = guild_id
+        self.name = "Benchmark Guild"
+        self._channels = {channel.id: channel for channel in channels}
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+
+class FakeMember:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.bot = False
+        self.mention = f"<@{user_id}>"
+
+    def __str__(self):
+        return f"user{self.id}"
+
+    def is_timed_out(self):
+        return False
+
+    async def timeout(self, until, reason=None):
+        pass
+
+
+class FakeMessage:
+    __slots__ = ("id", "content", "author", "guild", "channel", "embeds", "attachments")
+
+    def __init__(self, message_id, content, author, guild, channel):
+        self.id = message_id
+        self.content = content
+        self.author = author
+        self.guild = guild
+        self.channel = channel
+        self.embeds = []
+        self.attachments = []
+
+    async def delete(self):
+        pass
+
+
+def random_word(rng, lo=2, hi=9):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(lo, hi)))
+
+
+def make_rules(rng, keyword_count):
+    rules = {}
+    for i in range(0, keyword_count, 10):
+        rules[f"rule{i}"] = {
+            "action": rng.choice(["delete", "warn", "timeout"]),
+            "keywords": [random_word(rng, 5, 10) for _ in range(min(10, keyword_count - i))],
+            "reason": f"Rule rule{i} triggered",
+        }
+    return rules
+
+
+def obfuscate(rng, word):
+    tricks = [
+        lambda w: w.replace("a", "@").replace("o", "0").replace("s", "$").replace("e", "3"),
+        lambda w: "\u200b".join(w),
+        lambda w: "".join(chr(ord(c) + 0xFEE0) for c in w),
+        lambda w: w.replace("a", "\u0430").replace("e", "\u0435").replace("o", "\u043e"),
+    ]
+    return rng.choice(tricks)(word)
+
+
+def make_corpus(rng, rules, count, guild, channels):
+    keywords = [k for rule in rules.values() for k in rule["keywords"]] + BANNED_WORDS
+    kinds = rng.choices(list(CORPUS_MIX), weights=list(CORPUS_MIX.values()), k=count)
+    members = [FakeMember(10_000 + i) for i in range(2_000)]
+    spammers = [FakeMember(90_000 + i) for i in range(20)]
+    corpus = []
+    for i, kind in enumerate(kinds):
+        words = [random_word(rng) for _ in range(rng.randint(3, 25))]
+        author = rng.choice(members)
+        if kind == "toxic":
+            words.insert(rng.randrange(len(words)), rng.choice(keywords))
+        elif kind == "obfuscated":
+            words.insert(rng.randrange(len(words)), obfuscate(rng, rng.choice(keywords)))
+        elif kind == "spammy":
+            author = rng.choice(spammers)
+            words = rng.choice([["buy", "cheap", "followers", "now"], ["FREE", "STUFF", "CLICK", "HERE", "NOW"], ["@everyone"] * 8])
+        elif kind == "links":
+            words.append(rng.choice(["discord.gg/" + random_word(rng, 6, 8), "https://example.com/" + random_word(rng)]))
+        corpus.append((kind, FakeMessage(i, " ".join(words), author, guild, rng.choice(channels))))
+    return corpus
+
+
+def make_cog(rules):
+    with open("automod_settings.json", "w") as f:
+        json.dump(SETTINGS, f)
+    with open("automod_rules.json", "w") as f:
+        json.dump({str(GUILD_ID): rules}, f)
+    with open("config.json", "w") as f:
+        json.dump({str(GUILD_ID): {"log_channel": LOG_CHANNEL_ID}}, f)
+    return AutoMod(bot=None)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def start_cog(rules, corpus):
+    cog = make_cog(rules)
+    await cog.cog_load()
+    # Warm up: compiles the guild's matcher and fills caches.
+    for _, message in corpus[:50]:
+        await cog.on_message(message)
+    await cog.executor.queue.join()
+    return cog
+
+
+async def run_case(rng, keyword_count, message_count):
+    channels = [FakeChannel(3000 + i) for i in range(5)] + [FakeChannel(LOG_CHANNEL_ID)]
+    guild = FakeGuild(GUILD_ID, channels)
+    rules = make_rules(rng, keyword_count)
+    corpus = make_corpus(rng, rules, message_count, guild, channels[:-1])
+
+    cog = await start_cog(rules, corpus)
+    latencies = []
+    perf = time.perf_counter
+    start = perf()
+    for _, message in corpus:
+        t0 = perf()
+        await cog.on_message(message)
+        latencies.append(perf() - t0)
+    await cog.executor.queue.join()
+    elapsed = perf() - start
+    stats = cog.executor.stats()
+    await cog.cog_unload()
+
+    # Second run on a fresh cog with tracemalloc on; it slows everything
+    # down, so it's kept out of the timings above.
+    cog = await start_cog(rules, corpus)
+    tracemalloc.start()
+    allocated = []
+    peak = 0
+    for _, message in corpus:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await cog.on_message(message)
+        _, message_peak = tracemalloc.get_traced_memory()
+        allocated.append(message_peak - before)
+        peak = max(peak, message_peak)
+    await cog.executor.queue.join()
+    peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    await cog.cog_unload()
+
+    kinds = {}
+    for kind, _ in corpus:
+        kinds[kind] = kinds.get(kind, 0) + 1
+    return {
+        "keywords": keyword_count,
+        "messages": message_count,
+        "corpus": kinds,
+        "msgs_per_sec": message_count / elapsed,
+        "p50_us": percentile(latencies, 0.50) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "peak_kib": peak / 1024,
+        "alloc_p50_bytes": percentile(allocated, 0.50),
+        "alloc_p99_bytes": percentile(allocated, 0.99),
+        "actions_queued": stats["queued"],
+        "actions_coalesced": stats["coalesced"],
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results, baseline=None):
+    base = {r["keywords"]: r for r in (baseline or {}).get("results", [])}
+    print(f"{'keywords':>9} {'msg/s':>9} {'p50 us':>8} {'p99 us':>8} {'peak KiB':>9} {'alloc p50 B':>12} {'alloc p99 B':>12}  vs baseline")
+    for r in results:
+        delta = ""
+        if r["keywords"] in base:
+            delta = f"{(r['msgs_per_sec'] / base[r['keywords']]['msgs_per_sec'] - 1) * 100:+.1f}% msg/s"
+        print(f"{r['keywords']:>9} {r['msgs_per_sec']:>9.0f} {r['p50_us']:>8.1f} {r['p99_us']:>8.1f} "
+              f"{r['peak_kib']:>9.1f} {r['alloc_p50_bytes']:>12} {r['alloc_p99_bytes']:>12}  {delta}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5_000)
+    parser.add_argument("--keywords", type=int, nargs="+", default=KEYWORD_COUNTS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_automod.json")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    rng = random.Random(args.seed)
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # The cog reads and writes its JSON files relative to the CWD.
+        os.chdir(workdir)
+        try:
+            for keyword_count in args.keywords:
+                results.append(await run_case(rng, keyword_count, args.messages))
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "benchmark": "automod.on_message",
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_table(results, baseline)
+    print(f"\nwrote {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
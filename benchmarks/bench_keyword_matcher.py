@@ -0,0 +1,84 @@
+"""Messages/sec of the AutoMod keyword matcher vs. the old nested loop.
+
+Run from the repo root:  python benchmarks/bench_keyword_matcher.py
+"""
+
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs._keyword_matcher import KeywordMatcher
+
+KEYWORD_COUNTS = [10, 1_000, 50_000]
+KEYWORDS_PER_RULE = 10
+MESSAGES = 2_000
+
+
+def random_word(rng, lo=4, hi=10):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(lo, hi)))
+
+
+def make_rules(rng, keyword_count):
+    rules = {}
+    for i in range(0, keyword_count, KEYWORDS_PER_RULE):
+        rules[f"rule{i}"] = {
+            "action": "delete",
+            "keywords": [random_word(rng) for _ in range(min(KEYWORDS_PER_RULE, keyword_count - i))],
+        }
+    return rules
+
+
+def make_messages(rng, rules, count):
+    keywords = [k for rule in rules.values() for k in rule["keywords"]]
+    messages = []
+    for _ in range(count):
+        words = [random_word(rng, 2, 8) for _ in range(rng.randint(5, 30))]
+        if rng.random() < 0.1:
+            words.insert(rng.randrange(len(words)), rng.choice(keywords).upper())
+        messages.append(" ".join(words))
+    return messages
+
+
+def naive_first_match(rules, content):
+    for name, rule in rules.items():
+        for keyword in rule["keywords"]:
+            if keyword.lower() in content.lower():
+                return name, keyword
+    return None
+
+
+def rate(fn, messages):
+    start = time.perf_counter()
+    for content in messages:
+        fn(content)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def main():
+    rng = random.Random(1234)
+    print(f"{'keywords':>9} {'build ms':>9} {'naive msg/s':>12} {'matcher msg/s':>14} {'speedup':>8}")
+    for keyword_count in KEYWORD_COUNTS:
+        rules = make_rules(rng, keyword_count)
+        messages = make_messages(rng, rules, MESSAGES)
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(rules)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        # The nested loop gets painfully slow with big rule sets, so only time a slice.
+        naive_sample = messages[: max(20, MESSAGES * 10 // keyword_count)]
+        for content in naive_sample:
+            expected = naive_first_match(rules, content)
+            assert list(matcher.scan(content))[:1] == ([expected[0]] if expected else [])
+
+        naive = rate(lambda c: naive_first_match(rules, c), naive_sample)
+        compiled = rate(matcher.first_match, messages)
+        print(f"{keyword_count:>9} {build_ms:>9.1f} {naive:>12.0f} {compiled:>14.0f} {compiled / naive:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
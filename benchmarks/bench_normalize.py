@@ -0,0 +1,81 @@
+"""Cost of the confusable/leetspeak normalization in front of keyword matching.
+
+Run from the repo root:  python benchmarks/bench_normalize.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_keyword_matcher import make_messages, make_rules
+from cogs._keyword_matcher import KeywordMatcher
+from cogs._normalize import Normalizer
+
+KEYWORD_COUNTS = [10, 1_000]
+MESSAGES = 5_000
+ROUNDS = 5
+
+OBFUSCATIONS = [
+    lambda w: w.replace("a", "@").replace("o", "0").replace("s", "$"),
+    lambda w: "\u200b".join(w),
+    lambda w: "".join(chr(ord(c) + 0xFEE0) for c in w),
+    lambda w: w.replace("a", "\u0430").replace("e", "\u0435").replace("o", "\u043e"),
+]
+
+
+def obfuscate(rng, messages, rules):
+    keywords = [k for rule in rules.values() for k in rule["keywords"]]
+    out = []
+    for content in messages:
+        words = content.split()
+        words[rng.randrange(len(words))] = rng.choice(OBFUSCATIONS)(rng.choice(keywords))
+        out.append(" ".join(words))
+    return out
+
+
+def best_rate(fn, messages):
+    best = 0.0
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for content in messages:
+            fn(content)
+        best = max(best, len(messages) / (time.perf_counter() - start))
+    return best
+
+
+def main():
+    rng = random.Random(99)
+    start = time.perf_counter()
+    normalizer = Normalizer()
+    print(f"tables built in {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({len(normalizer.keyword_table)} entries)\n")
+
+    print(f"{'keywords':>9} {'corpus':>10} {'raw msg/s':>10} {'norm msg/s':>11} {'overhead':>9} {'raw hits':>9} {'norm hits':>10}")
+    for keyword_count in KEYWORD_COUNTS:
+        rules = make_rules(rng, keyword_count)
+        clean = make_messages(rng, rules, MESSAGES)
+        corpora = {"ascii": clean, "obfuscated": obfuscate(rng, clean, rules)}
+
+        raw = KeywordMatcher(rules)
+        normalized = KeywordMatcher(rules, normalize=normalizer.keywords)
+
+        def raw_match(content):
+            return raw.first_match(content)
+
+        def normalized_match(content):
+            return normalized.first_match(normalizer.keywords(content))
+
+        for name, messages in corpora.items():
+            raw_rate = best_rate(raw_match, messages)
+            norm_rate = best_rate(normalized_match, messages)
+            raw_hits = sum(raw_match(c) is not None for c in messages)
+            norm_hits = sum(normalized_match(c) is not None for c in messages)
+            overhead = (raw_rate / norm_rate - 1) * 100
+            print(f"{keyword_count:>9} {name:>10} {raw_rate:>10.0f} {norm_rate:>11.0f} {overhead:>8.1f}% {raw_hits:>9} {norm_hits:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Cold-launch vs pooled /screenshot.
+
+Serves a generated static page from a local HTTP server and screenshots it
+the old way (start Playwright and launch Chromium for every request) and
+through ``BrowserPool``, first one request at a time and then in concurrent
+bursts. Reports wall time, screenshots/sec and p50/p99 latency per request
+and writes everything to a JSON file:
+
+    python benchmarks/bench_screenshot.py --output screenshot.json
+
+Needs Chromium for Playwright (``playwright install chromium``).
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from playwright.async_api import async_playwright
+
+from cogs._browser_pool import BrowserPool
+
+PAGE = """<!doctype html>
+<html><head><title>bench</title>
+<style>body {{ font-family: sans-serif; margin: 40px; }} .card {{ padding: 12px; margin: 8px 0; background: #eef; border-radius: 8px; }}</style>
+</head><body><h1>Screenshot benchmark</h1>{cards}</body></html>
+"""
+
+
+def write_site(directory, cards=200):
+    with open(os.path.join(directory, "index.html"), "w") as f:
+        f.write(PAGE.format(cards="".join(f'<div class="card">Card {i}: lorem ipsum dolor sit amet</div>' for i in range(cards))))
+
+
+def serve(directory):
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=directory)
+    handler.log_message = lambda *args: None
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def cold_screenshot(url):
+    """What the cog used to do for every request."""
+    async with async_playwright() as p:
+        browser = await p.chromium.launch()
+        page = await browser.new_page()
+        await page.goto(url, timeout=15000)
+        data = await page.screenshot(full_page=True)
+        await browser.close()
+    return data
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def run_case(name, shoot, url, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            t0 = time.perf_counter()
+            await shoot(url)
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "case": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "per_sec": requests / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=3)
+    parser.add_argument("--pool-size", type=int, default=3)
+    parser.add_argument("--output", default="bench_screenshot.json")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as site:
+        write_site(site)
+        server = serve(site)
+        url = f"http://127.0.0.1:{server.server_address[1]}/index.html"
+        try:
+            for concurrency in (1, args.concurrency):
+                results.append(await run_case("cold", cold_screenshot, url, args.requests, concurrency))
+
+            pool = BrowserPool(size=args.pool_size)
+            t0 = time.perf_counter()
+            await pool.start()
+            startup = time.perf_counter() - t0
+            try:
+                await pool.screenshot(url)  # first load warms up the browser
+                for concurrency in (1, args.concurrency):
+                    results.append(await run_case("pool", pool.screenshot, url, args.requests, concurrency))
+                pool_stats = pool.stats()
+            finally:
+                await pool.stop()
+        finally:
+            server.shutdown()
+
+    report = {
+        "benchmark": "screenshot",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pool_startup_seconds": startup,
+        "pool": pool_stats,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"pool startup: {startup * 1000:.0f} ms")
+    print(f"{'case':<6} {'conc':>4} {'shots/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        print(f"{r['case']:<6} {r['concurrency']:>4} {r['per_sec']:>8.2f} {r['p50_ms']:>8.0f} {r['p99_ms']:>8.0f}")
+    print(f"\nwrote {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
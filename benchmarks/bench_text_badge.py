@@ -0,0 +1,95 @@
+"""Old vs new draw_text_with_background.
+
+The old path built a temporary RGBA image, drew the rounded box, ran
+MaxFilter(5) over it and pasted it twice before drawing the text. The new
+one pastes cached corner pieces and a cached text mask. Both are run over
+the same strings on the welcome template and compared pixel for pixel.
+
+Run from the repo root:  python benchmarks/bench_text_badge.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops, ImageDraw, ImageFilter
+
+from cogs._cards import _TEXT_MASKS, draw_text_with_background, get_text_size
+from cogs._templates import templates
+
+TEMPLATE = "Assets/WelcomeTrash.png"
+FONT = "Assets/arial.ttf"
+ROUNDS = 200
+TEXTS = [
+    "Welcome to Trash Panda Lounge!\nGet trashed soon.",
+    "Invited by unknown",
+    "Invited by someone | Link used 42 times",
+    "Welcome to G, all 100 of you!",
+    "i",
+]
+
+
+def draw_text_with_background_old(draw, position, text, font, padding=10):
+    text_width, text_height = get_text_size(font, text)
+    x, y = position
+
+    bg_x0 = x - padding
+    bg_y0 = y - padding
+    bg_x1 = x + text_width + padding
+    bg_y1 = y + text_height + padding
+
+    temp_img = Image.new("RGBA", (bg_x1 - bg_x0, bg_y1 - bg_y0), (0, 0, 0, 0))
+    temp_draw = ImageDraw.Draw(temp_img)
+
+    radius = padding
+    temp_draw.ellipse((0, 0, radius*2, radius*2), fill=(255, 0, 0, 255))
+    temp_draw.ellipse((temp_img.width - radius*2, 0, temp_img.width, radius*2), fill=(255, 0, 0, 255))
+    temp_draw.ellipse((0, temp_img.height - radius*2, radius*2, temp_img.height), fill=(255, 0, 0, 255))
+    temp_draw.ellipse((temp_img.width - radius*2, temp_img.height - radius*2, temp_img.width, temp_img.height), fill=(255, 0, 0, 255))
+
+    temp_draw.rectangle([radius, 0, temp_img.width - radius, temp_img.height], fill=(255, 0, 0, 255))
+    temp_draw.rectangle([0, radius, temp_img.width, temp_img.height - radius], fill=(255, 0, 0, 255))
+
+    outline_img = temp_img.filter(ImageFilter.MaxFilter(5))
+    draw.bitmap((bg_x0, bg_y0), outline_img, fill=None)
+    draw.bitmap((bg_x0, bg_y0), temp_img, fill=None)
+    draw.text((x, y), text, font=font, fill="black")
+
+
+def run(fn, base, font, texts, padding):
+    image = base.copy()
+    draw = ImageDraw.Draw(image)
+    for i, text in enumerate(texts):
+        fn(draw, (20, 20 + i * 70), text, font, padding)
+    return image
+
+
+def best_time(fn, base, font, texts, padding):
+    best = float("inf")
+    for _ in range(ROUNDS):
+        draw = ImageDraw.Draw(base.copy())
+        start = time.perf_counter()
+        fn(draw, (30, 200), texts[0], font, padding)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    base = templates.image(TEMPLATE)
+    print(f"{'size':>5} {'padding':>8} {'old us':>8} {'new us':>8} {'speedup':>8}  identical")
+    for size in (24, 40, 64):
+        font = templates.font(FONT, size)
+        for padding in (6, 10, 16):
+            old = run(draw_text_with_background_old, base, font, TEXTS, padding)
+            _TEXT_MASKS.clear()
+            new = run(draw_text_with_background, base, font, TEXTS, padding)
+            identical = ImageChops.difference(old, new).getbbox() is None
+            old_t = best_time(draw_text_with_background_old, base, font, TEXTS, padding)
+            new_t = best_time(draw_text_with_background, base, font, TEXTS, padding)
+            print(f"{size:>5} {padding:>8} {old_t * 1e6:>8.0f} {new_t * 1e6:>8.0f} {old_t / new_t:>7.1f}x  {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,7 +18,9 @@ if not DISCORD_TOKEN:
 
 # Set up intents and bot
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix="!", intents=intents)
+# Ghost pings are caught from TrashBot's mention index, so nothing needs
+# discord.py's cache of full Message objects.
+bot = commands.Bot(command_prefix="!", intents=intents, max_messages=None)
 
 @bot.event
 async def on_ready():
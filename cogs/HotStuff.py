@@ -1,6 +1,21 @@
+import io
+import time
+
 import discord
 from discord.ext import commands
-import aiohttp
+
+from cogs._automod_sync import keyword_rule, rollout, sync_rules
+
+# The native AutoMod rules every guild should have. `!automod` brings a
+# guild in line with this list; running it again only sends what changed.
+NATIVE_RULES = [
+    keyword_rule("No Swearing", ["badword1", "badword2"]),
+    keyword_rule("No Spam Links", ["buy now", "free nitro"]),
+    keyword_rule("No Discord Invites", ["discord.gg/"]),
+    keyword_rule("No Slurs", ["slur1", "slur2"]),
+    keyword_rule("No Caps Rage", ["AAAAAAAA", "OMGOMG"]),
+]
+PROGRESS_INTERVAL = 2.0
 
 class AutoModManager(commands.Cog):
     def __init__(self, bot):
@@ -8,58 +23,32 @@ class AutoModManager(commands.Cog):
 
     @commands.command(name="automod")
     @commands.has_permissions(administrator=True)
-    async def create_automod_rules(self, ctx):
-        """Create up to 5 AutoMod keyword rules (admin only)"""
-        await ctx.send("Creating AutoMod rules...")
-
-        guild_id = ctx.guild.id
-        bot_token = self.bot.http.token
-
-        # Define up to 5 keyword rules
-        keyword_rules = [
-            {"name": "No Swearing", "keywords": ["badword1", "badword2"]},
-            {"name": "No Spam Links", "keywords": ["buy now", "free nitro"]},
-            {"name": "No Discord Invites", "keywords": ["discord.gg/"]},
-            {"name": "No Slurs", "keywords": ["slur1", "slur2"]},
-            {"name": "No Caps Rage", "keywords": ["AAAAAAAA", "OMGOMG"]}
-        ]
-
-        created = 0
-
-        async with aiohttp.ClientSession() as session:
-            for rule in keyword_rules:
-                payload = {
-                    "name": rule["name"],
-                    "event_type": 1,  # MESSAGE_SEND
-                    "trigger_type": 1,  # KEYWORD
-                    "trigger_metadata": {
-                        "keyword_filter": rule["keywords"]
-                    },
-                    "enabled": True,
-                    "actions": [
-                        {
-                            "type": 1,  # BLOCK_MESSAGE
-                            "metadata": {
-                                "custom_message": "🚫 AutoMod: Your message was blocked!"
-                            }
-                        }
-                    ]
-                }
-
-                url = f"https://discord.com/api/v10/guilds/{guild_id}/auto-moderation/rules"
-                headers = {
-                    "Authorization": f"Bot {bot_token}",
-                    "Content-Type": "application/json"
-                }
-
-                async with session.post(url, json=payload, headers=headers) as resp:
-                    if resp.status == 201:
-                        created += 1
-                    else:
-                        error = await resp.text()
-                        await ctx.send(f"Failed to create rule `{rule['name']}`: {resp.status} — {error}")
-
-        await ctx.send(f"✅ Created {created} AutoMod rule(s).")
+    @commands.guild_only()
+    async def create_automod_rules(self, ctx, mode: str = "apply"):
+        """Sync the native AutoMod rules for this server (admin only). Use `preview` to see the changes first."""
+        dry_run = mode.lower() == "preview"
+        await ctx.send("Checking AutoMod rules..." if dry_run else "Syncing AutoMod rules...")
+
+        try:
+            result = await sync_rules(
+                self.bot.http,
+                ctx.guild.id,
+                NATIVE_RULES,
+                owner_id=self.bot.user.id,
+                reason=f"AutoMod sync by {ctx.author}",
+                dry_run=dry_run,
+            )
+        except ValueError as e:
+            return await ctx.send(f"❌ {e}")
+
+        for name, error in result.errors:
+            await ctx.send(f"Failed to sync rule `{name}`: {error}")
+
+        lines = [f"{'📝 Would change' if dry_run else '✅ Synced'} AutoMod rules: {result.summary()}."]
+        for label, names in (("Create", result.created), ("Update", result.updated), ("Delete", result.deleted)):
+            if names:
+                lines.append(f"{label}: " + ", ".join(f"`{n}`" for n in names))
+        await ctx.send("\n".join(lines))
 
     @create_automod_rules.error
     async def automod_error(self, ctx, error):
@@ -68,5 +57,69 @@ class AutoModManager(commands.Cog):
         else:
             await ctx.send(f"An error occurred: {error}")
 
+    @commands.command(name="automodrollout")
+    @commands.is_owner()
+    async def rollout_automod_rules(self, ctx):
+        """Sync the native AutoMod rules into every server the bot is in (owner only)"""
+        guilds = [g for g in self.bot.guilds if g.me.guild_permissions.manage_guild]
+        skipped = [g for g in self.bot.guilds if not g.me.guild_permissions.manage_guild]
+        status = await ctx.send(f"Rolling out AutoMod rules to {len(guilds)} server(s)...")
+        last_update = time.monotonic()
+
+        async def on_progress(done, total):
+            nonlocal last_update
+            # Editing on every guild would get the status message itself rate limited.
+            if done < total and time.monotonic() - last_update < PROGRESS_INTERVAL:
+                return
+            last_update = time.monotonic()
+            try:
+                await status.edit(content=f"Rolling out AutoMod rules... {done}/{total} server(s) done")
+            except discord.HTTPException:
+                pass
+
+        started = time.monotonic()
+        results = await rollout(
+            self.bot.http,
+            [g.id for g in guilds],
+            NATIVE_RULES,
+            owner_id=self.bot.user.id,
+            reason=f"AutoMod rollout by {ctx.author}",
+            on_progress=on_progress,
+        )
+        elapsed = time.monotonic() - started
+
+        rows = []
+        failed = len(skipped)
+        for guild in guilds:
+            result = results[guild.id]
+            if isinstance(result, Exception):
+                failed += 1
+                rows.append((guild.name, "FAILED", str(result)))
+            elif result.errors:
+                failed += 1
+                rows.append((guild.name, "PARTIAL", f"{result.summary()}; {len(result.errors)} error(s): {result.errors[0][1]}"))
+            else:
+                rows.append((guild.name, "OK", result.summary()))
+        for guild in skipped:
+            rows.append((guild.name, "SKIPPED", "missing Manage Server permission"))
+
+        width = max([len(name[:30]) for name, _, _ in rows] + [6])
+        table = "\n".join(f"{name[:30]:<{width}}  {state:<7}  {detail}" for name, state, detail in rows)
+        summary = (
+            f"{'✅' if not failed else '⚠️'} AutoMod rollout finished in {elapsed:.1f}s: "
+            f"{len(rows) - failed} succeeded, {failed} failed or skipped."
+        )
+        if len(table) + len(summary) < 1900:
+            await ctx.send(f"{summary}\n```\n{table}\n```")
+        else:
+            await ctx.send(summary, file=discord.File(io.BytesIO(table.encode()), filename="automod_rollout.txt"))
+
+    @rollout_automod_rules.error
+    async def rollout_error(self, ctx, error):
+        if isinstance(error, commands.NotOwner):
+            await ctx.send("❌ Only the bot owner can use this command.")
+        else:
+            await ctx.send(f"An error occurred: {error}")
+
 async def setup(bot):
     await bot.add_cog(AutoModManager(bot))
@@ -0,0 +1,162 @@
+"""Queued executor for AutoMod moderation actions.
+
+``AutoMod.on_message`` only enqueues what should happen; a single worker
+drains the queue in batches so the gateway listener never waits on REST.
+Within a batch deletes in the same channel become one bulk delete, repeated
+warnings and timeouts for the same member collapse to one call, and the
+calls are grouped by route (the major parameter Discord buckets on) so each
+route has at most one request in flight while different routes run side by
+side.
+"""
+
+import asyncio
+import time
+from collections import deque
+from datetime import timedelta
+
+import discord
+
+BULK_DELETE_LIMIT = 100
+TIMEOUT_SECONDS = 30
+
+
+class _Job:
+    __slots__ = ("action", "message", "reason", "queued_at")
+
+    def __init__(self, action, message, reason):
+        self.action = action
+        self.message = message
+        self.reason = reason
+        self.queued_at = time.monotonic()
+
+
+class ActionExecutor:
+    def __init__(self, max_queue=10_000, max_batch=500, linger=0.05):
+        self.max_batch = max_batch
+        self.linger = linger
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.latencies = deque(maxlen=512)
+        self.counts = {"queued": 0, "dropped": 0, "coalesced": 0, "failed": 0, "rate_limited": 0}
+        self._worker = None
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def submit(self, message, action, reason):
+        """Queue ``action`` for ``message``; never blocks the caller."""
+        try:
+            self.queue.put_nowait(_Job(action, message, reason))
+        except asyncio.QueueFull:
+            self.counts["dropped"] += 1
+            return False
+        self.counts["queued"] += 1
+        return True
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            # Give the rest of a burst a moment to land in the same batch.
+            await asyncio.sleep(self.linger)
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self._execute(batch)
+            except Exception as e:
+                print("[AutoMod Action Error]", e)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _execute(self, batch):
+        deletes = {}
+        warns = {}
+        timeouts = {}
+        routes = {}
+
+        for job in batch:
+            message = job.message
+            if job.action == "delete":
+                deletes.setdefault(message.channel.id, (message.channel, {}))[1][message.id] = job
+            elif job.action == "warn":
+                if (message.channel.id, message.author.id) in warns:
+                    self.counts["coalesced"] += 1
+                    continue
+                warns[(message.channel.id, message.author.id)] = job
+            elif job.action == "timeout":
+                if not isinstance(message.author, discord.Member):
+                    continue
+                if (message.guild.id, message.author.id) in timeouts:
+                    self.counts["coalesced"] += 1
+                    continue
+                timeouts[(message.guild.id, message.author.id)] = job
+
+        for channel_id, (channel, jobs) in deletes.items():
+            jobs = list(jobs.values())
+            chunks = [jobs[i:i + BULK_DELETE_LIMIT] for i in range(0, len(jobs), BULK_DELETE_LIMIT)]
+            self.counts["coalesced"] += len(jobs) - len(chunks)
+            routes.setdefault(("delete", channel_id), []).extend((self._delete, chunk) for chunk in chunks)
+        for (channel_id, _), job in warns.items():
+            routes.setdefault(("send", channel_id), []).append((self._warn, [job]))
+        for (guild_id, _), job in timeouts.items():
+            routes.setdefault(("member", guild_id), []).append((self._timeout, [job]))
+
+        await asyncio.gather(*(self._run_route(calls) for calls in routes.values()))
+
+    async def _run_route(self, calls):
+        for call, jobs in calls:
+            try:
+                await call(jobs)
+            except discord.RateLimited as e:
+                # discord.py gave up waiting on this bucket; hold the route and retry once.
+                self.counts["rate_limited"] += 1
+                await asyncio.sleep(e.retry_after)
+                try:
+                    await call(jobs)
+                except discord.HTTPException as e:
+                    self.counts["failed"] += len(jobs)
+                    print("[AutoMod Action Error]", e)
+            except discord.HTTPException as e:
+                self.counts["failed"] += len(jobs)
+                print("[AutoMod Action Error]", e)
+            now = time.monotonic()
+            self.latencies.extend(now - job.queued_at for job in jobs)
+
+    async def _delete(self, jobs):
+        channel = jobs[0].message.channel
+        messages = [job.message for job in jobs]
+        if len(messages) > 1 and hasattr(channel, "delete_messages"):
+            await channel.delete_messages(messages, reason="AutoMod")
+        else:
+            for message in messages:
+                await message.delete()
+
+    async def _warn(self, jobs):
+        message = jobs[0].message
+        await message.channel.send(f"{message.author.mention}, please avoid saying that.", delete_after=5)
+
+    async def _timeout(self, jobs):
+        job = jobs[0]
+        member = job.message.author
+        if member.is_timed_out():
+            return
+        until = discord.utils.utcnow() + timedelta(seconds=TIMEOUT_SECONDS)
+        await member.timeout(until, reason=job.reason)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        if latencies:
+            p50 = latencies[len(latencies) // 2]
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        else:
+            p50 = p99 = 0.0
+        return dict(self.counts, depth=self.queue.qsize(), p50_ms=p50 * 1000, p99_ms=p99 * 1000)
@@ -0,0 +1,149 @@
+"""Animated welcome and trash cards for GIF avatars.
+
+The card functions in ``cogs._cards`` only ever blend the avatar into the
+card linearly, so instead of running them once per frame the card is
+rendered three times with a flat avatar: transparent (``F0``), black
+(``F1``) and white (``F2``). For a frame with colour ``c`` and alpha ``a``
+the finished pixel is then
+
+    F1 + (F0 - F1) * (1 - a) + (F2 - F1) / 255 * c * a
+
+which NumPy evaluates for every frame at once, and only inside the box
+where the three renders differ. Opaque and fully transparent avatar pixels
+come out exactly as the static card draws them; partly transparent edge
+pixels can differ slightly, since the welcome card's double paste isn't
+quite linear in alpha. Frames are capped at ``MAX_FRAMES``
+(longer animations are sampled evenly, durations folded into the kept
+frames). The flat renders are scaled down to ``MAX_PIXELS`` before any
+frame is composited, so a large template costs three full-size renders
+rather than n full-size frames. The result is encoded as
+animated WebP or GIF, whichever is smaller, stepping down frame count and
+size until it fits the byte budget. Meant to run in a render worker.
+"""
+
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from cogs._cards import AVATAR_SIZE, CARDS
+from cogs._encoder import DEFAULT_BUDGET, Encoded
+
+MAX_FRAMES = 48
+MAX_PIXELS = 500_000
+MIN_DURATION = 20  # ms; browsers slow anything faster down to 100
+
+
+def decode_frames(data, size=AVATAR_SIZE, max_frames=MAX_FRAMES):
+    """(frames as an (n, size, size, 4) uint8 array, per-frame durations in ms)."""
+    with Image.open(BytesIO(data)) as img:
+        total = getattr(img, "n_frames", 1)
+        keep = np.linspace(0, total - 1, min(total, max_frames)).round().astype(int)
+        # Each kept frame also covers the time of the frames dropped after it.
+        owner = np.searchsorted(keep, np.arange(total), side="right") - 1
+        frames = np.empty((len(keep), size, size, 4), dtype=np.uint8)
+        durations = [0] * len(keep)
+        wanted = set(keep.tolist())
+        slot = 0
+        for index in range(total):
+            img.seek(index)
+            durations[owner[index]] += img.info.get("duration", 100) or 100
+            if index in wanted:
+                frames[slot] = np.asarray(img.convert("RGBA").resize((size, size)))
+                slot += 1
+    return frames, [max(MIN_DURATION, d) for d in durations]
+
+
+def composite(spec, data, max_pixels=MAX_PIXELS):
+    """Every frame of the card, scaled to fit ``max_pixels``, as an (n, h, w, 3) uint8 array, and the durations.
+
+    Only the three flat renders are made at template size; they are scaled
+    down before anything per-frame is allocated, and the avatar frames are
+    decoded straight at their scaled size.
+    """
+    card = CARDS[spec["kind"]]
+    flat = [
+        card(dict(spec, avatar=Image.new("RGBA", (AVATAR_SIZE, AVATAR_SIZE), colour))).convert("RGB")
+        for colour in ((0, 0, 0, 0), (0, 0, 0, 255), (255, 255, 255, 255))
+    ]
+    width, height = flat[0].size
+    # Where the avatar went is found at full size, where the renders are exact.
+    f0, f1, f2 = (np.asarray(img) for img in flat)
+    footprint = (f2 != f1).any(axis=2)
+    changed = footprint | (f0 != f1).any(axis=2)
+    ys, xs = np.nonzero(changed)
+    avatar_at = np.argwhere(footprint).min(axis=0) if len(ys) else None
+
+    scale = min(1.0, (max_pixels / (width * height)) ** 0.5)
+    if scale < 1.0:
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        f0, f1, f2 = (np.asarray(img.resize(size, Image.Resampling.BILINEAR)) for img in flat)
+    del flat
+    frames, durations = decode_frames(data, max(1, round(AVATAR_SIZE * scale)))
+
+    out = np.repeat(f0[None], len(frames), axis=0)
+    if avatar_at is None:
+        return out, durations
+    height, width = f0.shape[:2]
+    y0, x0 = int(ys.min() * scale), int(xs.min() * scale)
+    y1 = min(height, int(np.ceil((ys.max() + 1) * scale)))
+    x1 = min(width, int(np.ceil((xs.max() + 1) * scale)))
+    f0, f1, f2 = (f[y0:y1, x0:x1].astype(np.float32) for f in (f0, f1, f2))
+    under = f0 - f1
+    gain = (f2 - f1) / 255.0
+
+    # Put each frame where the card pasted the avatar, in scaled coordinates.
+    ay = min(y1 - y0 - 1, round(avatar_at[0] * scale) - y0)
+    ax = min(x1 - x0 - 1, round(avatar_at[1] * scale) - x0)
+    pixels = np.zeros((len(frames), y1 - y0, x1 - x0, 4), dtype=np.float32)
+    h = min(frames.shape[1], y1 - y0 - ay)
+    w = min(frames.shape[2], x1 - x0 - ax)
+    pixels[:, ay:ay + h, ax:ax + w] = frames[:, :h, :w]
+
+    alpha = pixels[..., 3:4] / 255.0
+    region = f1 + under * (1.0 - alpha) + gain * pixels[..., :3] * alpha
+    out[:, y0:y1, x0:x1] = np.clip(region + 0.5, 0, 255).astype(np.uint8)
+    return out, durations
+
+
+def _save(frames, durations, fmt):
+    buffer = BytesIO()
+    if fmt == "webp":
+        images = [Image.fromarray(frame) for frame in frames]
+        images[0].save(buffer, format="WEBP", save_all=True, append_images=images[1:],
+                       duration=durations, loop=0, quality=80, method=4)
+    else:
+        # One palette built from a sample of frames and no dithering: several
+        # times faster than quantizing each frame, smaller, and no flicker.
+        sample = Image.fromarray(np.concatenate(frames[::max(1, len(frames) // 8)], axis=0))
+        palette = sample.quantize(256, method=Image.Quantize.MEDIANCUT)
+        images = [Image.fromarray(frame).quantize(palette=palette, dither=Image.Dither.NONE) for frame in frames]
+        images[0].save(buffer, format="GIF", save_all=True, append_images=images[1:],
+                       duration=durations, loop=0)
+    return buffer.getvalue()
+
+
+def _halve_frames(frames, durations):
+    merged = [a + b for a, b in zip(durations[::2], durations[1::2] + [0])]
+    return frames[::2], merged
+
+
+def render_animated(spec):
+    """Render an animated card spec (``avatar`` is the GIF bytes) to an ``Encoded``."""
+    start = time.perf_counter()
+    output = spec.get("output", {})
+    budget = output.get("budget", DEFAULT_BUDGET)
+
+    frames, durations = composite(spec, spec["avatar"])
+
+    while True:
+        best = min(((fmt, _save(frames, durations, fmt)) for fmt in ("webp", "gif")), key=lambda c: len(c[1]))
+        if len(best[1]) <= budget:
+            break
+        if len(frames) > 2:
+            frames, durations = _halve_frames(frames, durations)
+        else:
+            size = (max(1, frames.shape[2] * 3 // 4), max(1, frames.shape[1] * 3 // 4))
+            frames = np.stack([np.asarray(Image.fromarray(f).resize(size, Image.Resampling.BILINEAR)) for f in frames])
+    return Encoded(best[1], best[0], len(best[1]), time.perf_counter() - start)
@@ -0,0 +1,98 @@
+"""Sliding-window spam detector backing the ``antispam`` toggle.
+
+Each (channel, user) pair gets a fixed-size ring of message timestamps and
+content hashes stored in ``array`` buffers, so a tracked user costs the same
+couple of hundred bytes no matter how much they post. Tracks are kept in
+LRU order, which lets idle ones be swept from the front and caps the total
+during raids.
+"""
+
+import time
+from array import array
+from collections import OrderedDict
+
+DEFAULT_SPAM_SETTINGS = {
+    "spam_messages": 5,
+    "spam_seconds": 5.0,
+    "duplicate_messages": 3,
+    "duplicate_seconds": 30.0,
+}
+
+
+class _Track:
+    __slots__ = ("times", "hashes", "pos", "count")
+
+    def __init__(self, size):
+        self.times = array("d", bytes(8 * size))
+        self.hashes = array("q", bytes(8 * size))
+        self.pos = 0
+        self.count = 0
+
+
+class SpamDetector:
+    def __init__(self, settings=None, max_tracked=20_000, idle_seconds=120.0, clock=time.monotonic):
+        settings = settings or {}
+        self.spam_messages, self.spam_seconds, self.duplicate_messages, self.duplicate_seconds = (
+            settings.get(key, value) for key, value in DEFAULT_SPAM_SETTINGS.items()
+        )
+        self.size = max(self.spam_messages, self.duplicate_messages, 2)
+        self.max_tracked = max_tracked
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        self.evicted = 0
+        self._tracks = OrderedDict()
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def record(self, channel_id, user_id, content):
+        """Record a message and return a reason string if it counts as spam."""
+        now = self.clock()
+        key = (channel_id, user_id)
+        track = self._tracks.get(key)
+        if track is None:
+            track = self._tracks[key] = _Track(self.size)
+            if len(self._tracks) > self.max_tracked:
+                self._tracks.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._tracks.move_to_end(key)
+
+        size = self.size
+        digest = hash(content.strip().lower()) if content else 0
+        times, hashes = track.times, track.hashes
+        times[track.pos] = now
+        hashes[track.pos] = digest
+        track.pos = (track.pos + 1) % size
+        track.count = min(track.count + 1, size)
+
+        # The N-th most recent timestamp tells us whether N messages fit in the window.
+        if track.count >= self.spam_messages:
+            oldest = times[(track.pos - self.spam_messages) % size]
+            if now - oldest <= self.spam_seconds:
+                return f"Spam ({self.spam_messages} messages in {self.spam_seconds:g}s)"
+
+        if digest and track.count >= self.duplicate_messages:
+            repeats = 0
+            for i in range(track.count):
+                if hashes[i] == digest and now - times[i] <= self.duplicate_seconds:
+                    repeats += 1
+            if repeats >= self.duplicate_messages:
+                return f"Repeated message ({repeats}x)"
+        return None
+
+    def sweep(self):
+        """Forget tracks that have been quiet for ``idle_seconds``; returns how many."""
+        cutoff = self.clock() - self.idle_seconds
+        tracks = self._tracks
+        removed = 0
+        while tracks:
+            track = next(iter(tracks.values()))
+            if track.times[(track.pos - 1) % self.size] > cutoff:
+                break
+            tracks.popitem(last=False)
+            removed += 1
+        return removed
+
+    def stats(self):
+        return {"tracked": len(self._tracks), "max_tracked": self.max_tracked, "evicted": self.evicted}
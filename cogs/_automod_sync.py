@@ -0,0 +1,262 @@
+"""Declarative sync for Discord's native AutoMod rules.
+
+The caller describes the rules a guild *should* have; ``sync_rules`` fetches
+what the guild has, works out the smallest set of create / PATCH / delete
+calls to get there and sends them through the bot's own ``HTTPClient`` so
+they share discord.py's rate limiter. Rules are matched by name. Only rules
+the bot created itself are ever deleted, so rules moderators set up by hand
+are left alone.
+
+Everything goes through ``http.*_auto_moderation_rule*``, so pointing
+``discord.http.Route.BASE`` at a local stub server is enough to exercise a
+sync without touching Discord.
+
+``rollout`` runs the same sync over many guilds with bounded concurrency,
+backing off per guild when Discord answers 429.
+"""
+
+import asyncio
+import json
+
+import discord
+
+KEYWORD_TRIGGER = 1
+MESSAGE_SEND = 1
+BLOCK_MESSAGE = 1
+# Discord's own limits for keyword rules.
+MAX_KEYWORD_RULES = 6
+MAX_KEYWORDS = 1000
+MAX_KEYWORD_LENGTH = 60
+
+ROLLOUT_CONCURRENCY = 5
+ROLLOUT_RETRIES = 3
+ROLLOUT_BACKOFF = 2.0
+
+DEFAULT_BLOCK_MESSAGE = "🚫 AutoMod: Your message was blocked!"
+
+
+def keyword_rule(name, keywords, custom_message=DEFAULT_BLOCK_MESSAGE, allow_list=(), enabled=True):
+    """Payload for a keyword rule that blocks the message."""
+    return {
+        "name": name,
+        "event_type": MESSAGE_SEND,
+        "trigger_type": KEYWORD_TRIGGER,
+        "trigger_metadata": {"keyword_filter": list(keywords), "allow_list": list(allow_list)},
+        "enabled": enabled,
+        "actions": [{"type": BLOCK_MESSAGE, "metadata": {"custom_message": custom_message}}],
+        "exempt_roles": [],
+        "exempt_channels": [],
+    }
+
+
+class SyncResult:
+    def __init__(self):
+        self.created = []
+        self.updated = []
+        self.deleted = []
+        self.unchanged = []
+        self.errors = []
+
+    def summary(self):
+        return (
+            f"created {len(self.created)}, updated {len(self.updated)}, "
+            f"deleted {len(self.deleted)}, unchanged {len(self.unchanged)}"
+        )
+
+
+def _normalize(value):
+    if isinstance(value, list):
+        return sorted(str(v) for v in value)
+    return value
+
+
+def _actions_key(actions):
+    return sorted(
+        (action["type"], json.dumps({k: v for k, v in (action.get("metadata") or {}).items() if v}, sort_keys=True))
+        for action in actions or []
+    )
+
+
+def diff_rule(existing, desired):
+    """Fields of ``desired`` that differ from ``existing``, ready for a PATCH."""
+    changes = {}
+    for key in ("event_type", "enabled"):
+        if existing.get(key) != desired[key]:
+            changes[key] = desired[key]
+    metadata = existing.get("trigger_metadata") or {}
+    if any(_normalize(metadata.get(k, [])) != _normalize(v) for k, v in desired["trigger_metadata"].items()):
+        changes["trigger_metadata"] = desired["trigger_metadata"]
+    if _actions_key(existing.get("actions")) != _actions_key(desired["actions"]):
+        changes["actions"] = desired["actions"]
+    for key in ("exempt_roles", "exempt_channels"):
+        if _normalize(existing.get(key, [])) != _normalize(desired.get(key, [])):
+            changes[key] = desired.get(key, [])
+    return changes
+
+
+def _owned(rule, owner_id):
+    return owner_id is not None and str(rule.get("creator_id")) == str(owner_id)
+
+
+def _group_by_name(existing):
+    by_name = {}
+    for rule in existing:
+        by_name.setdefault(rule["name"], []).append(rule)
+    return by_name
+
+
+def _pick(matches, desired, owner_id):
+    """Split the existing rules named like ``desired`` into the one to keep and the rest.
+
+    Old versions of ``!automod`` created a fresh copy on every run, so a name
+    can appear several times. A rule with the right trigger type is kept,
+    preferring one the bot created.
+    """
+    ranked = sorted(
+        matches,
+        key=lambda rule: (rule["trigger_type"] != desired["trigger_type"], not _owned(rule, owner_id)),
+    )
+    return (ranked[0] if ranked else None), ranked[1:]
+
+
+def validate(desired, existing=(), owner_id=None):
+    """Raise ValueError if applying ``desired`` would break Discord's limits."""
+    names = [rule["name"] for rule in desired]
+    if len(names) != len(set(names)):
+        raise ValueError("Rule names in the spec must be unique.")
+    for rule in desired:
+        if rule["trigger_type"] != KEYWORD_TRIGGER:
+            continue
+        keywords = rule["trigger_metadata"].get("keyword_filter", [])
+        if len(keywords) > MAX_KEYWORDS:
+            raise ValueError(f"Rule `{rule['name']}` has {len(keywords)} keywords (max {MAX_KEYWORDS}).")
+        too_long = [k for k in keywords if len(k) > MAX_KEYWORD_LENGTH]
+        if too_long:
+            raise ValueError(f"Rule `{rule['name']}` has keywords over {MAX_KEYWORD_LENGTH} characters: {too_long[:3]}")
+
+    # Keyword rules we don't manage still count against the guild's limit,
+    # and so do duplicates of our names that someone else created.
+    by_name = _group_by_name(existing)
+    leftover = []
+    for rule in desired:
+        leftover += _pick(by_name.pop(rule["name"], []), rule, owner_id)[1]
+    leftover += [rule for matches in by_name.values() for rule in matches]
+    foreign = [
+        rule for rule in leftover
+        if rule["trigger_type"] == KEYWORD_TRIGGER and not _owned(rule, owner_id)
+    ]
+    keyword_rules = sum(rule["trigger_type"] == KEYWORD_TRIGGER for rule in desired) + len(foreign)
+    if keyword_rules > MAX_KEYWORD_RULES:
+        raise ValueError(
+            f"The guild would need {keyword_rules} keyword rules but Discord allows {MAX_KEYWORD_RULES}; "
+            "merge keywords with the same action into one rule."
+        )
+
+
+def plan_sync(existing, desired, owner_id=None):
+    """Return the ``(op, rule_id, name, payload)`` calls needed to reach ``desired``."""
+    by_name = _group_by_name(existing)
+
+    ops = []
+    for rule in desired:
+        current, extras = _pick(by_name.pop(rule["name"], []), rule, owner_id)
+        for extra in extras:
+            if _owned(extra, owner_id):
+                ops.append(("delete", extra["id"], rule["name"], None))
+        if current is None:
+            ops.append(("create", None, rule["name"], rule))
+        elif current["trigger_type"] != rule["trigger_type"]:
+            # The trigger type can't be PATCHed.
+            ops.append(("delete", current["id"], rule["name"], None))
+            ops.append(("create", None, rule["name"], rule))
+        else:
+            changes = diff_rule(current, rule)
+            ops.append(("edit" if changes else "keep", current["id"], rule["name"], changes))
+
+    for matches in by_name.values():
+        for rule in matches:
+            if _owned(rule, owner_id):
+                ops.append(("delete", rule["id"], rule["name"], None))
+    return ops
+
+
+async def sync_rules(http, guild_id, desired, owner_id=None, reason="AutoMod rule sync", dry_run=False):
+    existing = await http.get_auto_moderation_rules(guild_id)
+    validate(desired, existing, owner_id)
+    ops = plan_sync(existing, desired, owner_id)
+
+    result = SyncResult()
+    # Deletes first so creates never trip the per-guild rule limit.
+    ops.sort(key=lambda op: op[0] != "delete")
+    for op, rule_id, name, payload in ops:
+        if op == "keep":
+            result.unchanged.append(name)
+            continue
+        try:
+            if dry_run:
+                pass
+            elif op == "create":
+                await http.create_auto_moderation_rule(guild_id, reason=reason, **payload)
+            elif op == "edit":
+                await http.edit_auto_moderation_rule(guild_id, rule_id, reason=reason, **payload)
+            elif op == "delete":
+                await http.delete_auto_moderation_rule(guild_id, rule_id, reason=reason)
+        except Exception as e:
+            result.errors.append((name, e))
+            continue
+        {"create": result.created, "edit": result.updated, "delete": result.deleted}[op].append(name)
+    return result
+
+
+def _retry_after(error):
+    """Seconds to wait before retrying ``error``, or None if it isn't a rate limit."""
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after
+    if isinstance(error, discord.HTTPException) and error.status == 429:
+        return 0.0
+    return None
+
+
+async def sync_guild(http, guild_id, desired, owner_id=None, reason="AutoMod rule sync",
+                     retries=ROLLOUT_RETRIES, backoff=ROLLOUT_BACKOFF):
+    """``sync_rules`` with exponential backoff on 429s.
+
+    Syncing is idempotent, so a retry just re-diffs and sends whatever is
+    still missing. 403s are not retried; they won't fix themselves.
+    """
+    for attempt in range(retries + 1):
+        delay = backoff * 2 ** attempt
+        try:
+            result = await sync_rules(http, guild_id, desired, owner_id=owner_id, reason=reason)
+        except discord.HTTPException as e:
+            retry_after = _retry_after(e)
+            if retry_after is None or attempt == retries:
+                raise
+            await asyncio.sleep(max(delay, retry_after))
+            continue
+        limited = [_retry_after(e) for _, e in result.errors if _retry_after(e) is not None]
+        if not limited or attempt == retries:
+            return result
+        await asyncio.sleep(max(delay, *limited))
+
+
+async def rollout(http, guild_ids, desired, owner_id=None, reason="AutoMod rule rollout",
+                  concurrency=ROLLOUT_CONCURRENCY, on_progress=None):
+    """Sync ``desired`` into every guild; returns {guild_id: SyncResult or exception}.
+
+    ``on_progress(done, total)`` is awaited after each guild finishes.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {}
+
+    async def run(guild_id):
+        async with semaphore:
+            try:
+                results[guild_id] = await sync_guild(http, guild_id, desired, owner_id=owner_id, reason=reason)
+            except Exception as e:
+                results[guild_id] = e
+        if on_progress is not None:
+            await on_progress(len(results), len(guild_ids))
+
+    await asyncio.gather(*(run(guild_id) for guild_id in guild_ids))
+    return results
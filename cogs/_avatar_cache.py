@@ -0,0 +1,186 @@
+"""Shared avatar cache for the image cogs.
+
+Avatars are fetched at the smallest CDN size that covers the card, decoded
+and resized to RGBA once, and kept in an LRU bounded by decoded bytes.
+Entries are keyed by (asset key, size, format); the asset key is Discord's avatar
+hash, so a member who changes their avatar simply gets a new entry.
+
+Concurrent requests for the same avatar (a ghost ping and a trashpile at
+once, or a raid of members with the default avatar) share one download.
+With ``disk_dir`` set, resized avatars are also written there as PNGs and
+survive restarts.
+
+Animated avatars are kept the same way, as the GIF bytes the CDN sends
+(``animated=True``), since the render workers decode the frames themselves.
+"""
+
+import asyncio
+import os
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+
+
+def _cdn_size(size):
+    """Smallest power of two the CDN serves that is at least ``size``."""
+    cdn = 16
+    while cdn < size and cdn < 4096:
+        cdn *= 2
+    return cdn
+
+
+def _decode(data, size):
+    with Image.open(BytesIO(data)) as img:
+        return img.convert("RGBA").resize((size, size))
+
+
+def _decode_file(path):
+    with Image.open(path) as img:
+        return img.convert("RGBA")
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _image_bytes(image):
+    if isinstance(image, bytes):
+        return len(image)
+    return image.width * image.height * len(image.getbands())
+
+
+class AvatarCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None, max_disk_bytes=DEFAULT_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.bytes = 0
+        self.counts = {"hits": 0, "disk_hits": 0, "downloads": 0, "shared": 0, "evictions": 0}
+        self._images = OrderedDict()
+        self._inflight = {}
+        self._disk_bytes = None
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._images)
+
+    async def get(self, asset, size=200, animated=False):
+        """RGBA ``size``x``size`` image for ``asset``. Shared; copy before drawing on it.
+
+        With ``animated`` the GIF bytes at the CDN size covering ``size`` are
+        returned instead.
+        """
+        key = (asset.key, size, "gif" if animated else "png")
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+            self.counts["hits"] += 1
+            return image
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.counts["shared"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            image = await self._load(asset, key, size)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the error; nobody else needs to retrieve it.
+            future.exception()
+            raise
+        else:
+            future.set_result(image)
+            self._store(key, image)
+            return image
+        finally:
+            del self._inflight[key]
+
+    async def _load(self, asset, key, size):
+        path = self._disk_path(key)
+        fmt = key[2]
+        if path is not None and os.path.exists(path):
+            try:
+                image = await asyncio.to_thread(_read_file if fmt == "gif" else _decode_file, path)
+                self.counts["disk_hits"] += 1
+                return image
+            except OSError:
+                pass
+        data = await asset.with_format(fmt).with_size(_cdn_size(size)).read()
+        self.counts["downloads"] += 1
+        if fmt == "gif":
+            image = data
+        else:
+            image = await asyncio.to_thread(_decode, data, size)
+        if path is not None:
+            await asyncio.to_thread(self._write_disk, path, image)
+        return image
+
+    def _store(self, key, image):
+        self._images[key] = image
+        self.bytes += _image_bytes(image)
+        while self.bytes > self.max_bytes and len(self._images) > 1:
+            _, evicted = self._images.popitem(last=False)
+            self.bytes -= _image_bytes(evicted)
+            self.counts["evictions"] += 1
+
+    def _disk_path(self, key):
+        if not self.disk_dir:
+            return None
+        asset_key, size, fmt = key
+        return os.path.join(self.disk_dir, f"{asset_key}_{size}.{fmt}")
+
+    def _write_disk(self, path, image):
+        tmp = path + ".tmp"
+        if isinstance(image, bytes):
+            with open(tmp, "wb") as f:
+                f.write(image)
+        else:
+            image.save(tmp, format="PNG")
+        os.replace(tmp, path)
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(self.disk_dir))
+        else:
+            self._disk_bytes += os.path.getsize(path)
+        if self._disk_bytes > self.max_disk_bytes:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        # Least recently used first; reads bump atime on most systems, mtime otherwise.
+        entries = sorted(os.scandir(self.disk_dir), key=lambda e: max(e.stat().st_atime, e.stat().st_mtime))
+        total = sum(entry.stat().st_size for entry in entries)
+        target = self.max_disk_bytes * 0.8
+        for entry in entries:
+            if total <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    def stats(self):
+        return dict(self.counts, entries=len(self._images), bytes=self.bytes, inflight=len(self._inflight))
+
+
+avatars = AvatarCache(disk_dir=os.getenv("AVATAR_CACHE_DIR"))
+
+
+async def card_avatar(asset, size):
+    """Render-spec fields for an avatar: the GIF bytes for animated ones, else the cached image."""
+    if asset.is_animated():
+        return {"avatar": await avatars.get(asset, size, animated=True), "animated": True}
+    return {"avatar": await avatars.get(asset, size)}
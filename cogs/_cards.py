@@ -0,0 +1,183 @@
+"""Pillow rendering for the welcome and trashpile cards.
+
+Everything here is plain CPU work on picklable inputs so it can run in a
+worker process: a render spec is a dict with the card ``kind``, the
+``template`` path, the avatar as encoded bytes (or an already resized RGBA
+image from the avatar cache) and the text ``lines``. ``render`` returns the
+finished card encoded by ``cogs._encoder``; an optional ``output`` dict in
+the spec holds its ``quality`` and ``budget``. Templates come from the
+per-process ``templates`` cache, so each worker decodes them once.
+
+Text badges are assembled from cached pieces: the rounded corners of the
+badge mask are cut once per padding (nine-slice; the edges and middle are
+solid) and each (font, string) is rasterized once into an LRU, so a card is
+mostly pastes.
+"""
+
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from cogs._encoder import encode
+from cogs._templates import templates
+
+AVATAR_SIZE = 200
+COLLAGE_TILE = 64
+COLLAGE_GAP = 6
+COLLAGE_COLUMNS = 10
+COLLAGE_HEADER = 90
+# Extra room around a badge's corners in the reference it is cut from;
+# MaxFilter(5) reaches 2px, so corners further apart than this never meet.
+BADGE_MARGIN = 6
+TEXT_CACHE_SIZE = 256
+
+_BADGE_CORNERS = {}
+_TEXT_MASKS = OrderedDict()
+
+
+def get_text_size(font, text):
+    bbox = font.getbbox(text)
+    width = bbox[2] - bbox[0]
+    height = bbox[3] - bbox[1]
+    return width, height
+
+def _badge_mask_reference(width, height, padding):
+    """The badge shape drawn from scratch: a rounded box grown by MaxFilter(5)."""
+    temp_img = Image.new("L", (width, height), 0)
+    temp_draw = ImageDraw.Draw(temp_img)
+
+    radius = padding
+    temp_draw.ellipse((0, 0, radius*2, radius*2), fill=255)
+    temp_draw.ellipse((width - radius*2, 0, width, radius*2), fill=255)
+    temp_draw.ellipse((0, height - radius*2, radius*2, height), fill=255)
+    temp_draw.ellipse((width - radius*2, height - radius*2, width, height), fill=255)
+
+    temp_draw.rectangle([radius, 0, width - radius, height], fill=255)
+    temp_draw.rectangle([0, radius, width, height - radius], fill=255)
+    return temp_img.filter(ImageFilter.MaxFilter(5))
+
+
+def _badge_corners(padding):
+    corners = _BADGE_CORNERS.get(padding)
+    if corners is None:
+        size = padding * 2 + BADGE_MARGIN
+        ref = _badge_mask_reference(size, size, padding)
+        r = padding
+        corners = _BADGE_CORNERS[padding] = (
+            ref.crop((0, 0, r, r)),
+            ref.crop((size - r, 0, size, r)),
+            ref.crop((0, size - r, r, size)),
+            ref.crop((size - r, size - r, size, size)),
+        )
+    return corners
+
+
+def badge_mask(width, height, padding):
+    """Mask of the badge behind text; everything outside the corners is solid."""
+    if min(width, height) < padding * 2 + BADGE_MARGIN:
+        # Too small for the corners not to touch.
+        return _badge_mask_reference(width, height, padding)
+    top_left, top_right, bottom_left, bottom_right = _badge_corners(padding)
+    r = padding
+    mask = Image.new("L", (width, height), 255)
+    mask.paste(top_left, (0, 0))
+    mask.paste(top_right, (width - r, 0))
+    mask.paste(bottom_left, (0, height - r))
+    mask.paste(bottom_right, (width - r, height - r))
+    return mask
+
+
+def text_mask(font, text):
+    """Antialiased coverage mask of ``text`` and its offset from the draw position."""
+    key = (id(font), text)
+    entry = _TEXT_MASKS.get(key)
+    if entry is not None:
+        _TEXT_MASKS.move_to_end(key)
+        return entry[1], entry[2]
+    left, top, right, bottom = ImageDraw.Draw(Image.new("L", (1, 1))).textbbox((0, 0), text, font=font)
+    mask = Image.new("L", (max(1, right - left), max(1, bottom - top)), 0)
+    ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255)
+    # Holding the font keeps its id from being reused while the entry lives.
+    _TEXT_MASKS[key] = (font, mask, (left, top))
+    if len(_TEXT_MASKS) > TEXT_CACHE_SIZE:
+        _TEXT_MASKS.popitem(last=False)
+    return mask, (left, top)
+
+
+def draw_text_with_background(draw, position, text, font, padding=10):
+    text_width, text_height = get_text_size(font, text)
+    x, y = position
+
+    # The badge uses the draw's default ink, as the old two-pass bitmap
+    # paste (outline, then box) did.
+    mask = badge_mask(text_width + padding * 2, text_height + padding * 2, padding)
+    draw.bitmap((x - padding, y - padding), mask, fill=None)
+    # Draw text on top
+    glyphs, (left, top) = text_mask(font, text)
+    draw.bitmap((x + left, y + top), glyphs, fill="black")
+
+
+def load_avatar(avatar, size=AVATAR_SIZE):
+    """``avatar`` is either encoded image bytes or an RGBA image from the avatar cache."""
+    if isinstance(avatar, Image.Image):
+        return avatar if avatar.size == (size, size) else avatar.resize((size, size))
+    with Image.open(BytesIO(avatar)) as img:
+        return img.convert("RGBA").resize((size, size))
+
+
+def welcome_card(spec):
+    base = templates.image(spec["template"])
+    avatar_img = load_avatar(spec["avatar"])
+
+    outline = Image.new("RGBA", (210, 210), (0, 0, 0, 255))
+    outline.paste(avatar_img, (5, 5), avatar_img)
+    base.paste(outline, (30, 180), outline)
+
+    draw = ImageDraw.Draw(base)
+    font = templates.font(spec["font"], spec.get("font_size", 40))
+    welcome_text, invite_info = spec["lines"]
+    draw_text_with_background(draw, (260, 200), welcome_text, font)
+    draw_text_with_background(draw, (30, 350), invite_info, font)
+    return base
+
+
+def trash_card(spec):
+    base = templates.image(spec["template"])
+    pfp_img = load_avatar(spec["avatar"])
+    base.paste(pfp_img, (900, 900), pfp_img)
+
+    draw = ImageDraw.Draw(base)
+    font = ImageFont.load_default()
+    draw.text((860, 1120), spec["lines"][0], font=font, fill="white")
+    return base
+
+
+def collage_card(spec):
+    """Grid of avatars for a join burst, on the welcome template stretched to fit."""
+    avatars = spec["avatars"]
+    step = COLLAGE_TILE + COLLAGE_GAP
+    columns = max(1, min(COLLAGE_COLUMNS, len(avatars)))
+    rows = -(-len(avatars) // columns)
+    width = max(columns * step + COLLAGE_GAP, 600)
+    height = COLLAGE_HEADER + rows * step + COLLAGE_GAP
+
+    base = templates.base(spec["template"]).resize((width, height))
+    left = (width - columns * step + COLLAGE_GAP) // 2
+    for i, avatar in enumerate(avatars):
+        tile = load_avatar(avatar, COLLAGE_TILE)
+        row, column = divmod(i, columns)
+        base.paste(tile, (left + column * step, COLLAGE_HEADER + row * step), tile)
+
+    draw = ImageDraw.Draw(base)
+    font = templates.font(spec["font"], spec.get("font_size", 32))
+    draw_text_with_background(draw, (20, 25), spec["lines"][0], font)
+    return base
+
+
+CARDS = {"welcome": welcome_card, "trash": trash_card, "collage": collage_card}
+
+
+def render(spec):
+    """Render ``spec`` and return it as an ``Encoded`` image."""
+    return encode(CARDS[spec["kind"]](spec), **spec.get("output", {}))
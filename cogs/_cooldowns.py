@@ -0,0 +1,71 @@
+"""Bounded, self-expiring cooldown store for the AutoMod cog.
+
+Entries live in an insertion-ordered dict keyed by whatever the caller
+chooses (a user ID, ``(guild_id, user_id)``, ...). Setting a cooldown moves
+its key to the back, so the front always holds the entries that were set
+longest ago and are the first to expire. That keeps ``is_active`` and
+``set`` O(1), lets sweeps stop at the first live entry, and gives a cheap
+victim when the hard cap is hit.
+"""
+
+import time
+from collections import OrderedDict
+
+
+class CooldownStore:
+    def __init__(self, max_entries=50_000, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self.expired = 0
+        self.evicted = 0
+        self._expiry = OrderedDict()
+
+    def __len__(self):
+        return len(self._expiry)
+
+    def is_active(self, key):
+        until = self._expiry.get(key)
+        if until is None:
+            return False
+        if self.clock() < until:
+            return True
+        del self._expiry[key]
+        self.expired += 1
+        return False
+
+    def set(self, key, seconds):
+        expiry = self._expiry
+        now = self.clock()
+        expiry[key] = now + seconds
+        expiry.move_to_end(key)
+        # Amortise the cleanup: every write retires a couple of stale entries.
+        self._sweep(now, limit=2)
+        while len(expiry) > self.max_entries:
+            expiry.popitem(last=False)
+            self.evicted += 1
+
+    def sweep(self):
+        """Drop every expired entry at the front of the store; returns how many."""
+        return self._sweep(self.clock())
+
+    def _sweep(self, now, limit=None):
+        expiry = self._expiry
+        removed = 0
+        # Entries with a longer cooldown can sit ahead of shorter ones set
+        # later; those are caught by is_active() or the next sweep instead.
+        while expiry and (limit is None or removed < limit):
+            key, until = next(iter(expiry.items()))
+            if until > now:
+                break
+            del expiry[key]
+            removed += 1
+        self.expired += removed
+        return removed
+
+    def stats(self):
+        return {
+            "entries": len(self._expiry),
+            "max_entries": self.max_entries,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
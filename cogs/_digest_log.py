@@ -0,0 +1,148 @@
+"""Buffered AutoMod log that posts one digest per guild per window.
+
+Hits are grouped by (user, rule) with a count, the distinct reasons given
+(which often carry per-message details such as a caps percentage) and a few
+content samples.
+Small digests go out as a single embed; large ones (a raid) get a summary
+embed plus the full breakdown attached as a JSONL file, so the log channel
+sees one message per window instead of one per hit. If long rule names push
+the top groups past Discord's embed size limit, the rest continue in a
+second embed message rather than the send failing.
+"""
+
+import asyncio
+import io
+import json
+import time
+
+import discord
+
+DEFAULT_WINDOW = 30
+MAX_SAMPLES = 3
+MAX_REASONS = 5
+SAMPLE_LENGTH = 100
+EMBED_GROUPS = 10
+EMBED_LIMIT = 6000  # Discord's cap on the total text in a message's embeds
+
+
+class _Group:
+    __slots__ = ("user_id", "user", "mention", "rule", "count", "reasons", "samples", "channels", "first", "last")
+
+    def __init__(self, author, rule):
+        self.user_id = author.id
+        self.user = str(author)
+        self.mention = author.mention
+        self.rule = rule
+        self.count = 0
+        self.reasons = {}
+        self.samples = []
+        self.channels = set()
+        self.first = self.last = time.time()
+
+
+class DigestLogger:
+    def __init__(self, resolve):
+        # resolve(guild) -> (log channel or None, window seconds)
+        self.resolve = resolve
+        self.flushed = 0
+        self._buffers = {}
+        self._guilds = {}
+        self._timers = {}
+
+    def add(self, guild, message, rule, reason):
+        channel, window = self.resolve(guild)
+        if channel is None:
+            return
+        self._guilds[guild.id] = guild
+        groups = self._buffers.setdefault(guild.id, {})
+        group = groups.get((message.author.id, rule))
+        if group is None:
+            group = groups[(message.author.id, rule)] = _Group(message.author, rule)
+        group.count += 1
+        if reason in group.reasons or len(group.reasons) < MAX_REASONS:
+            group.reasons[reason] = group.reasons.get(reason, 0) + 1
+        group.last = time.time()
+        group.channels.add(message.channel.id)
+        if len(group.samples) < MAX_SAMPLES and message.content:
+            group.samples.append(message.content[:SAMPLE_LENGTH])
+        if guild.id not in self._timers:
+            self._timers[guild.id] = asyncio.create_task(self._flush_later(guild, window))
+
+    def pending(self):
+        return sum(group.count for groups in self._buffers.values() for group in groups.values())
+
+    async def _flush_later(self, guild, window):
+        try:
+            await asyncio.sleep(window)
+        finally:
+            self._timers.pop(guild.id, None)
+        await self.flush(guild)
+
+    async def flush(self, guild):
+        groups = self._buffers.pop(guild.id, None)
+        self._guilds.pop(guild.id, None)
+        channel, _ = self.resolve(guild)
+        if not groups or channel is None:
+            return
+        groups = sorted(groups.values(), key=lambda g: g.count, reverse=True)
+        total = sum(g.count for g in groups)
+
+        footer = None
+        if len(groups) > EMBED_GROUPS:
+            footer = f"Top {EMBED_GROUPS} of {len(groups)} shown, full list attached."
+        embed = discord.Embed(
+            title="[AutoMod] Digest",
+            description=f"{total} hit(s) from {len({g.user_id for g in groups})} user(s)",
+            color=discord.Color.orange(),
+        )
+        embeds = [embed]
+        for group in groups[:EMBED_GROUPS]:
+            samples = "\n".join(f"`{s.replace('`', 'ˋ')}`" for s in group.samples)
+            reasons = ", ".join(reason if n == 1 else f"{reason} ×{n}" for reason, n in group.reasons.items())
+            name = f"{group.user} — {group.rule}"[:256]
+            value = f"{group.mention} ×{group.count}: {reasons}\n{samples}"[:1024]
+            # The footer goes on the last embed, so leave room for it in each.
+            if len(embed) + len(name) + len(value) + len(footer or "") > EMBED_LIMIT:
+                embed = discord.Embed(title="[AutoMod] Digest (continued)", color=discord.Color.orange())
+                embeds.append(embed)
+            embed.add_field(name=name, value=value, inline=False)
+
+        file = None
+        if footer is not None:
+            embed.set_footer(text=footer)
+            lines = (
+                json.dumps({
+                    "user_id": g.user_id,
+                    "user": g.user,
+                    "rule": g.rule,
+                    "count": g.count,
+                    "reasons": g.reasons,
+                    "channels": sorted(g.channels),
+                    "first": g.first,
+                    "last": g.last,
+                    "samples": g.samples,
+                })
+                for g in groups
+            )
+            file = discord.File(io.BytesIO("\n".join(lines).encode()), filename="automod_digest.jsonl")
+
+        try:
+            # The limit covers all embeds in a message, so each gets its own.
+            for embed in embeds[:-1]:
+                await channel.send(embed=embed)
+            if file is None:
+                await channel.send(embed=embeds[-1])
+            else:
+                await channel.send(embed=embeds[-1], file=file)
+            self.flushed += 1
+        except discord.HTTPException as e:
+            print("[AutoMod Log Error]", e)
+
+    async def close(self):
+        for timer in list(self._timers.values()):
+            timer.cancel()
+        self._timers.clear()
+        for guild_id in list(self._buffers):
+            guild = self._guilds.get(guild_id)
+            if guild is not None:
+                await self.flush(guild)
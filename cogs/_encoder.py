@@ -0,0 +1,99 @@
+"""Size-budgeted image encoding shared by the card renderers.
+
+``encode`` tries every format the requested quality level allows, keeps the
+smallest result and, if even that is over ``budget`` bytes, steps lossy
+quality down and then the resolution until it fits. The returned
+``Encoded`` carries the bytes, the file extension to upload them under and
+how much smaller they are than the plain PNG the cogs used to send.
+
+Quality levels (the plain PNG is always a candidate):
+    lossless  optimised PNG or lossless WebP; pixels are untouched
+    high      256-colour PNG or WebP q90
+    medium    256-colour PNG, WebP q75 or JPEG q85 (JPEG only for opaque images)
+
+Each extra format costs roughly one more PNG encode, so the levels only
+try the ones that tend to win for card-like images.
+"""
+
+import time
+from io import BytesIO
+
+from PIL import Image
+
+DEFAULT_BUDGET = 8 * 1024 * 1024
+
+FORMATS = {
+    "lossless": ("png_opt", "webp_lossless"),
+    "high": ("png8", "webp90"),
+    "medium": ("png8", "webp75", "jpeg85"),
+}
+EXTENSIONS = {"png": "png", "png8": "png", "webp": "webp", "jpeg": "jpg", "gif": "gif"}
+
+
+class Encoded:
+    __slots__ = ("data", "format", "baseline", "seconds")
+
+    def __init__(self, data, format, baseline, seconds):
+        self.data = data
+        self.format = format
+        self.baseline = baseline
+        self.seconds = seconds
+
+    @property
+    def saved(self):
+        return self.baseline - len(self.data)
+
+    @property
+    def extension(self):
+        return EXTENSIONS[self.format]
+
+    def filename(self, stem):
+        return f"{stem}.{self.extension}"
+
+
+def _opaque(image):
+    return "A" not in image.getbands() or image.getchannel("A").getextrema()[0] == 255
+
+
+def _save(image, name):
+    buffer = BytesIO()
+    if name == "png_opt":
+        image.save(buffer, format="PNG", optimize=True)
+        return "png", buffer.getvalue()
+    if name == "png8":
+        image.quantize(256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.FLOYDSTEINBERG).save(buffer, format="PNG", optimize=True)
+        return "png8", buffer.getvalue()
+    if name == "webp_lossless":
+        image.save(buffer, format="WEBP", lossless=True, method=4)
+        return "webp", buffer.getvalue()
+    if name.startswith("webp"):
+        image.save(buffer, format="WEBP", quality=int(name[4:]), method=4)
+        return "webp", buffer.getvalue()
+    image.convert("RGB").save(buffer, format="JPEG", quality=int(name[4:]), optimize=True)
+    return "jpeg", buffer.getvalue()
+
+
+def encode(image, quality="high", budget=DEFAULT_BUDGET):
+    """Encode ``image`` as the smallest allowed format, fitting it under ``budget`` bytes."""
+    start = time.perf_counter()
+    baseline = BytesIO()
+    image.save(baseline, format="PNG")
+    baseline = baseline.getvalue()
+
+    names = [n for n in FORMATS[quality] if not n.startswith("jpeg") or _opaque(image)]
+    best = ("png", baseline)
+    for name in names:
+        candidate = _save(image, name)
+        if len(candidate[1]) < len(best[1]):
+            best = candidate
+
+    # Over budget: trade quality, then resolution, until it fits.
+    lossy = 60
+    while len(best[1]) > budget:
+        if lossy >= 30:
+            best = _save(image, f"webp{lossy}")
+            lossy -= 15
+        else:
+            image = image.resize((max(1, image.width * 3 // 4), max(1, image.height * 3 // 4)), Image.Resampling.LANCZOS)
+            best = _save(image, "webp60")
+    return Encoded(best[1], best[0], len(baseline), time.perf_counter() - start)
@@ -0,0 +1,89 @@
+"""Perceptual-hash index for catching re-posted spam images.
+
+``dhash`` shrinks an image to 9x8 greyscale and sets one bit per pixel
+that is brighter than its right-hand neighbour, giving a 64-bit hash that
+survives re-encoding, resizing and small edits. The comparison is done in
+NumPy and decoding is meant to run in a worker thread.
+
+``ImageHashIndex`` keeps a fixed-size ring of recent hashes per guild in
+NumPy arrays, so near-duplicates are found with one vectorised XOR and
+popcount. Its memory use is capped by ``capacity`` and ``max_guilds``.
+"""
+
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8
+MAX_IMAGE_BYTES = 8 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40_000_000
+# Per-entry cost of the ring: hash, author, timestamp.
+ENTRY_BYTES = 8 + 8 + 8
+
+
+def dhash(data, size=HASH_SIZE):
+    """64-bit difference hash of an encoded image."""
+    with Image.open(BytesIO(data)) as img:
+        if img.width * img.height > MAX_IMAGE_PIXELS:
+            raise ValueError("image too large to hash")
+        # Lets the JPEG decoder skip most of the work when shrinking.
+        img.draft("L", (size * 4, size * 4))
+        small = img.convert("L").resize((size + 1, size), Image.Resampling.BILINEAR)
+        pixels = np.asarray(small, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class _Ring:
+    __slots__ = ("hashes", "authors", "times", "pos", "count")
+
+    def __init__(self, capacity):
+        self.hashes = np.zeros(capacity, dtype=np.uint64)
+        self.authors = np.zeros(capacity, dtype=np.uint64)
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.pos = 0
+        self.count = 0
+
+
+class ImageHashIndex:
+    def __init__(self, capacity=512, max_guilds=1000, window=600.0, max_distance=6, clock=time.monotonic):
+        self.capacity = capacity
+        self.max_guilds = max_guilds
+        self.window = window
+        self.max_distance = max_distance
+        self.clock = clock
+        self._rings = OrderedDict()
+
+    def __len__(self):
+        return sum(ring.count for ring in self._rings.values())
+
+    def memory_bytes(self):
+        return len(self._rings) * self.capacity * ENTRY_BYTES
+
+    def add(self, guild_id, image_hash, author_id):
+        """Record a hash and return (posts, authors) of recent near-duplicates, including this one."""
+        now = self.clock()
+        ring = self._rings.get(guild_id)
+        if ring is None:
+            ring = self._rings[guild_id] = _Ring(self.capacity)
+            if len(self._rings) > self.max_guilds:
+                self._rings.popitem(last=False)
+        else:
+            self._rings.move_to_end(guild_id)
+
+        value = np.uint64(image_hash)
+        n = ring.count
+        distances = np.bitwise_count(ring.hashes[:n] ^ value)
+        near = (distances <= self.max_distance) & (ring.times[:n] >= now - self.window)
+        posts = int(near.sum()) + 1
+        authors = len(set(ring.authors[:n][near].tolist()) | {author_id})
+
+        ring.hashes[ring.pos] = value
+        ring.authors[ring.pos] = author_id
+        ring.times[ring.pos] = now
+        ring.pos = (ring.pos + 1) % self.capacity
+        ring.count = min(n + 1, self.capacity)
+        return posts, authors
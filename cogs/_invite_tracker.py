@@ -0,0 +1,141 @@
+"""Works out which invite a new member used.
+
+Discord doesn't say, so the tracker keeps a per-guild snapshot of invite use
+counts: taken once on ready, kept current from ``on_invite_create`` and
+``on_invite_delete``, and re-read on join. The invite whose count went up is
+the one that was used.
+
+Refreshes are coalesced: a join refreshes straight away if the guild hasn't
+been refreshed in the last ``min_interval`` seconds, otherwise it waits for
+the next refresh and shares it with every other join in the meantime, so a
+burst costs one ``invites()`` call per interval instead of one per member.
+"""
+
+import asyncio
+import time
+
+import discord
+
+
+class InviteUse:
+    __slots__ = ("code", "inviter", "uses")
+
+    def __init__(self, code, inviter, uses):
+        self.code = code
+        self.inviter = inviter
+        self.uses = uses
+
+
+class _Batch:
+    __slots__ = ("future", "members")
+
+    def __init__(self):
+        self.future = asyncio.get_running_loop().create_future()
+        self.members = 0
+
+
+def _snapshot(invites):
+    # code -> [uses, inviter name, max uses]
+    return {
+        inv.code: [inv.uses or 0, inv.inviter.name if inv.inviter else None, inv.max_uses or 0]
+        for inv in invites
+    }
+
+
+class InviteTracker:
+    def __init__(self, min_interval=2.0, gone_ttl=60.0):
+        self.min_interval = min_interval
+        self.gone_ttl = gone_ttl
+        self.refreshes = 0
+        self._invites = {}
+        # Deleted invites linger briefly: a max-uses invite is deleted by the
+        # very join that used it up, usually before on_member_join runs.
+        self._gone = {}
+        self._batches = {}
+        self._last_refresh = {}
+
+    def __contains__(self, guild_id):
+        return guild_id in self._invites
+
+    async def _fetch(self, guild):
+        self.refreshes += 1
+        self._last_refresh[guild.id] = time.monotonic()
+        try:
+            return _snapshot(await guild.invites())
+        except discord.Forbidden:
+            return None
+
+    async def snapshot(self, guild):
+        invites = await self._fetch(guild)
+        if invites is None:
+            self._invites.pop(guild.id, None)
+        else:
+            self._invites[guild.id] = invites
+
+    def forget(self, guild_id):
+        self._invites.pop(guild_id, None)
+        self._gone.pop(guild_id, None)
+        self._last_refresh.pop(guild_id, None)
+
+    def on_create(self, invite):
+        invites = self._invites.get(invite.guild.id)
+        if invites is not None:
+            invites[invite.code] = [invite.uses or 0, invite.inviter.name if invite.inviter else None, invite.max_uses or 0]
+
+    def on_delete(self, invite):
+        invites = self._invites.get(invite.guild.id)
+        if invites is None or invite.code not in invites:
+            return
+        gone = self._gone.setdefault(invite.guild.id, {})
+        gone[invite.code] = (invites.pop(invite.code), time.monotonic())
+
+    async def find_invite(self, member):
+        """The invite ``member`` most likely joined with, or None if it can't be told."""
+        guild = member.guild
+        batch = self._batches.get(guild.id)
+        if batch is None:
+            batch = self._batches[guild.id] = _Batch()
+            asyncio.create_task(self._refresh(guild, batch))
+        batch.members += 1
+        return await asyncio.shield(batch.future)
+
+    async def _refresh(self, guild, batch):
+        try:
+            wait = self._last_refresh.get(guild.id, 0) + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            # Joins from here on belong to the next refresh.
+            self._batches.pop(guild.id, None)
+            before = self._invites.get(guild.id)
+            after = await self._fetch(guild)
+            result = None if before is None or after is None else self._diff(guild.id, before, after)
+            if after is None:
+                self._invites.pop(guild.id, None)
+            else:
+                self._invites[guild.id] = after
+            batch.future.set_result(result)
+        except Exception as e:
+            if self._batches.get(guild.id) is batch:
+                del self._batches[guild.id]
+            batch.future.set_result(None)
+            print("[Invite Tracker Error]", e)
+
+    def _diff(self, guild_id, before, after):
+        used = []
+        for code, (uses, inviter, _) in after.items():
+            old = before.get(code)
+            if old is not None and uses > old[0]:
+                used.append(InviteUse(code, inviter, uses))
+            elif old is None and uses:
+                # Created and used before on_invite_create reached us.
+                used.append(InviteUse(code, inviter, uses))
+
+        now = time.monotonic()
+        gone = self._gone.pop(guild_id, {})
+        for code, ((uses, inviter, max_uses), deleted_at) in gone.items():
+            if now - deleted_at <= self.gone_ttl and max_uses and uses + 1 >= max_uses:
+                used.append(InviteUse(code, inviter, max_uses))
+
+        # With one invite in play every join in the batch used it; with
+        # several there is no telling who came through which.
+        return used[0] if len(used) == 1 else None
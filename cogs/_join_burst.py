@@ -0,0 +1,71 @@
+"""Adaptive batching of welcome cards during join bursts.
+
+Each guild's recent join times are kept in a short deque. While joins stay
+under ``threshold`` per ``per`` seconds every member gets their own card.
+Once the rate crosses it, new joins are buffered for ``window`` seconds and
+handed to ``flush(guild, members)`` together, so a raid produces one collage
+message per window rather than one upload per member. Normal cards come back
+as soon as the rate drops.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+
+class JoinBurst:
+    def __init__(self, flush, threshold=10, per=10.0, window=5.0, max_batch=100, clock=time.monotonic):
+        self.flush = flush
+        self.threshold = threshold
+        self.per = per
+        self.window = window
+        self.max_batch = max_batch
+        self.clock = clock
+        self.batches_sent = 0
+        self._joins = {}
+        self._pending = {}
+
+    def rate(self, guild_id):
+        times = self._joins.get(guild_id)
+        if not times:
+            return 0
+        cutoff = self.clock() - self.per
+        while times and times[0] < cutoff:
+            times.popleft()
+        return len(times)
+
+    def add(self, member):
+        """Record a join; True if it was buffered and the caller shouldn't send its own card."""
+        guild_id = member.guild.id
+        self._joins.setdefault(guild_id, deque()).append(self.clock())
+        pending = self._pending.get(guild_id)
+        if pending is None:
+            if self.rate(guild_id) <= self.threshold:
+                return False
+            pending = self._pending[guild_id] = []
+            asyncio.create_task(self._flush_later(member.guild, pending))
+        pending.append(member)
+        if len(pending) >= self.max_batch:
+            self._flush_now(member.guild, pending)
+        return True
+
+    def _flush_now(self, guild, batch):
+        # The batch may already have gone out early for hitting max_batch.
+        if self._pending.get(guild.id) is not batch:
+            return
+        del self._pending[guild.id]
+        self.batches_sent += 1
+        asyncio.create_task(self._send(guild, batch))
+
+    async def _flush_later(self, guild, batch):
+        await asyncio.sleep(self.window)
+        self._flush_now(guild, batch)
+        # Forget quiet guilds so the map doesn't grow with every guild ever joined.
+        if not self.rate(guild.id):
+            self._joins.pop(guild.id, None)
+
+    async def _send(self, guild, members):
+        try:
+            await self.flush(guild, members)
+        except Exception as e:
+            print("[Join Burst Error]", e)
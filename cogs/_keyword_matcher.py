@@ -0,0 +1,171 @@
+"""Aho-Corasick keyword matcher used by the AutoMod cog.
+
+All keywords of every rule are compiled into a single automaton so a message
+is scanned once, no matter how many rules or keywords are configured.
+Matching is case-insensitive substring matching, same as the old
+``keyword.lower() in message.content.lower()`` loop.
+
+An optional ``normalize`` callable (see ``cogs/_normalize.py``) is applied
+to keywords at build time; text handed to ``scan`` must already have been
+run through the same function, which is expected to lowercase it.
+
+Tiny rule sets skip the automaton: below ``LINEAR_SCAN_LIMIT`` keywords a
+handful of C-level ``in`` checks beats walking the text one character at a
+time in Python (see ``benchmarks/bench_keyword_matcher.py``).
+"""
+
+import time
+from collections import deque
+
+LINEAR_SCAN_LIMIT = 128
+
+
+class KeywordMatcher:
+    def __init__(self, rules=None, normalize=None):
+        self.normalize = normalize
+        self.rule_names = []
+        self.keyword_count = 0
+        self._linear = None
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        if rules:
+            self.build(rules)
+
+    def __bool__(self):
+        return self.keyword_count > 0
+
+    def build(self, rules):
+        """Compile ``{name: {"keywords": [...]}}`` into the automaton."""
+        self.rule_names = list(rules)
+        # "a,,b" used to leave an empty keyword behind, which matched every
+        # single message.
+        normalize = self.normalize or str
+        keywords = [
+            (index, normalize(keyword).lower(), keyword)
+            for index, rule in enumerate(rules.values())
+            for keyword in rule.get("keywords", [])
+            if keyword
+        ]
+        self.keyword_count = len(keywords)
+
+        if self.keyword_count <= LINEAR_SCAN_LIMIT:
+            self._linear = keywords
+            self._goto, self._fail, self._out = [{}], [0], [()]
+            return
+        self._linear = None
+
+        goto = [{}]
+        out = [[]]
+        for index, pattern, keyword in keywords:
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append((index, keyword))
+
+        # Breadth-first pass to wire up failure links, merging the outputs of
+        # each node's failure target so the scan never has to walk the chain.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt].extend(out[fail[nxt]])
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(o) for o in out]
+
+    def scan(self, text):
+        """Return ``{rule_name: keyword}`` for every rule hit in ``text``.
+
+        Rules come back in the order they were defined, each with the first
+        keyword that matched.
+        """
+        if not self.keyword_count:
+            return {}
+
+        if self.normalize is None:
+            text = text.lower()
+
+        if self._linear is not None:
+            hits = {}
+            for index, pattern, keyword in self._linear:
+                if index not in hits and pattern in text:
+                    hits[index] = keyword
+        else:
+            hits = self._walk(text)
+
+        names = self.rule_names
+        return {names[i]: hits[i] for i in sorted(hits)}
+
+    def _walk(self, text):
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = {}
+        state = 0
+        for ch in text:
+            while True:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            if out[state]:
+                for index, keyword in out[state]:
+                    if index not in hits:
+                        hits[index] = keyword
+        return hits
+
+    def first_match(self, text):
+        """Return ``(rule_name, keyword)`` for the first defined rule that hits, or None."""
+        for name, keyword in self.scan(text).items():
+            return name, keyword
+        return None
+
+
+class MatcherCache:
+    """Lazily compiled KeywordMatcher per rule set, dropped once it sits idle."""
+
+    def __init__(self, idle_seconds=1800, normalize=None):
+        self.idle_seconds = idle_seconds
+        self.normalize = normalize
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, rules):
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [KeywordMatcher(rules, self.normalize), now]
+        else:
+            entry[1] = now
+        return entry[0]
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def evict_idle(self):
+        """Drop matchers that haven't been used for ``idle_seconds``; returns how many."""
+        cutoff = time.monotonic() - self.idle_seconds
+        stale = [key for key, (_, last_used) in self._entries.items() if last_used < cutoff]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
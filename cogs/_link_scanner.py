@@ -0,0 +1,140 @@
+"""Link and invite scanning for AutoMod.
+
+``extract_links`` pulls URLs out of text with one compiled regex: scheme
+URLs, markdown ``[text](url)`` targets, ``<url>`` links and bare domains
+such as ``example.com/page``. With a scheme the host may also be an IPv4 or
+IPv6 literal or a single label (``http://localhost/``). Discord invites are
+recognised by host and path.
+
+Per-guild allow and deny lists live in a ``DomainTrie`` keyed on reversed
+labels (``com -> example -> www``), so checking a domain walks at most its
+own labels however many thousand entries a list holds. The most specific
+entry wins, which lets a guild deny ``example.com`` but allow
+``docs.example.com``.
+"""
+
+import re
+
+# Bare domains without a scheme or path are only treated as links for these
+# TLDs, so "file.txt" or "e.g." in normal chat don't count.
+COMMON_TLDS = frozenset("""
+    com net org io gg co me xyz info biz app dev ru su cn tk ml ga cf gq top
+    online site store shop club live link click pw cc tv ly to gl be us uk
+    de fr nl eu ca au in br jp kr vip icu buzz fun space website zip mov
+""".split())
+
+INVITE_HOSTS = frozenset({"discord.gg", "dsc.gg", "discord.io", "discord.me"})
+INVITE_PATH_HOSTS = frozenset({"discord.com", "discordapp.com", "canary.discord.com", "ptb.discord.com"})
+
+# Discord's own CDN hosts attachments; never flag those by default.
+DEFAULT_ALLOW = ("discord.com", "discordapp.com", "discordapp.net", "discord.media")
+
+LINK_PATTERN = re.compile(
+    r"""
+    (?<![\w.@/-])
+    (?P<scheme>[a-z][a-z0-9+.-]*://)?
+    (?(scheme)(?:[^\s/@<>]+@)?)
+    (?P<host>(?(scheme)
+        (?:\[[0-9a-f:.]+\]|(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)*[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?)
+    |
+        (?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+(?P<tld>[a-z][a-z0-9-]{1,23})
+    ))\.?
+    (?::\d{1,5})?
+    (?P<path>[/?\#][^\s<>()\[\]]*)?
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+class Link:
+    __slots__ = ("url", "domain", "invite")
+
+    def __init__(self, url, domain, invite=None):
+        self.url = url
+        self.domain = domain
+        self.invite = invite
+
+    def __repr__(self):
+        return f"Link({self.url!r}, domain={self.domain!r}, invite={self.invite!r})"
+
+
+def extract_links(text):
+    links = []
+    # Bare domains need a dot; IP and single-label hosts need a scheme.
+    if "." not in text and "://" not in text:
+        return links
+    for match in LINK_PATTERN.finditer(text):
+        scheme, host, tld, path = match.group("scheme", "host", "tld", "path")
+        host = host.lower().strip("[]")
+        if not scheme and not path and tld.lower() not in COMMON_TLDS:
+            continue
+        invite = None
+        if path:
+            if host in INVITE_HOSTS:
+                invite = path.lstrip("/").split("/")[0] or None
+            elif host.removeprefix("www.") in INVITE_PATH_HOSTS and path.startswith("/invite/"):
+                invite = path[len("/invite/"):].split("/")[0] or None
+        links.append(Link(match.group(), host, invite))
+    return links
+
+
+class DomainTrie:
+    def __init__(self, entries=None):
+        self._root = {}
+        self._size = 0
+        for domain, value in (entries or {}).items():
+            self.add(domain, value)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, domain, value):
+        node = self._root
+        for label in reversed(domain.lower().strip(".").split(".")):
+            node = node.setdefault(label, {})
+        if None not in node:
+            self._size += 1
+        # None can't be a label, so it marks "an entry ends here".
+        node[None] = value
+
+    def lookup(self, domain):
+        """Value of the most specific entry covering ``domain``, or None."""
+        node = self._root
+        found = None
+        for label in reversed(domain.split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            if None in node:
+                found = node[None]
+        return found
+
+
+class LinkPolicy:
+    def __init__(self, allow=(), deny=(), block_links=False, block_invites=False):
+        self.block_links = block_links
+        self.block_invites = block_invites
+        self.has_deny = bool(deny)
+        self.trie = DomainTrie()
+        for domain in DEFAULT_ALLOW:
+            self.trie.add(domain, True)
+        for domain in allow:
+            self.trie.add(domain, True)
+        for domain in deny:
+            self.trie.add(domain, False)
+
+    @property
+    def active(self):
+        return self.block_links or self.block_invites or self.has_deny
+
+    def check(self, links):
+        """Return a reason string for the first link that isn't allowed, or None."""
+        for link in links:
+            if link.invite is not None:
+                if self.block_invites:
+                    return f"Discord invite ({link.invite})"
+                continue
+            allowed = self.trie.lookup(link.domain)
+            if allowed is False or (allowed is None and self.block_links):
+                return f"Blocked link: {link.domain}"
+        return None
@@ -0,0 +1,89 @@
+"""Compact index of recent messages that mentioned someone, for ghost pings.
+
+``on_message_delete`` only fires for messages still in discord.py's message
+cache, which holds full ``Message`` objects. This keeps just what a ghost
+ping report needs (message, channel and author ids, up to ``max_mentions``
+mentioned user ids and the time) in flat arrays used as a ring buffer, plus
+a dict from message id to slot. Only messages that mention someone are
+stored, so the window covers far more chat than the message cache did, at
+a few dozen bytes per entry.
+"""
+
+import time
+from array import array
+
+
+class MentionRecord:
+    __slots__ = ("message_id", "channel_id", "guild_id", "author_id", "mentions", "created")
+
+    def __init__(self, message_id, channel_id, guild_id, author_id, mentions, created):
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.author_id = author_id
+        self.mentions = mentions
+        self.created = created
+
+
+class MentionIndex:
+    def __init__(self, capacity=20_000, max_mentions=5, max_age=24 * 3600, clock=time.time):
+        self.capacity = capacity
+        self.max_mentions = max_mentions
+        self.max_age = max_age
+        self.clock = clock
+        self.message_ids = array("Q", bytes(8 * capacity))
+        self.channel_ids = array("Q", bytes(8 * capacity))
+        self.guild_ids = array("Q", bytes(8 * capacity))
+        self.author_ids = array("Q", bytes(8 * capacity))
+        self.times = array("d", bytes(8 * capacity))
+        self.mention_counts = array("B", bytes(capacity))
+        self.mention_ids = array("Q", bytes(8 * capacity * max_mentions))
+        self._slots = {}
+        self._pos = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def memory_bytes(self):
+        arrays = (self.message_ids, self.channel_ids, self.guild_ids, self.author_ids,
+                  self.times, self.mention_counts, self.mention_ids)
+        # The dict is roughly 100 bytes per live entry on 64-bit CPython.
+        return sum(a.itemsize * len(a) for a in arrays) + len(self._slots) * 100
+
+    def add(self, message_id, channel_id, guild_id, author_id, mention_ids):
+        if not mention_ids:
+            return
+        slot = self._pos
+        self._pos = (slot + 1) % self.capacity
+        old = self.message_ids[slot]
+        if old and self._slots.get(old) == slot:
+            del self._slots[old]
+
+        self.message_ids[slot] = message_id
+        self.channel_ids[slot] = channel_id
+        self.guild_ids[slot] = guild_id or 0
+        self.author_ids[slot] = author_id
+        self.times[slot] = self.clock()
+        mention_ids = list(mention_ids)[:self.max_mentions]
+        self.mention_counts[slot] = len(mention_ids)
+        base = slot * self.max_mentions
+        self.mention_ids[base:base + len(mention_ids)] = array("Q", mention_ids)
+        self._slots[message_id] = slot
+
+    def pop(self, message_id):
+        """The record for a deleted message, or None if it wasn't indexed or is too old."""
+        slot = self._slots.pop(message_id, None)
+        if slot is None:
+            return None
+        created = self.times[slot]
+        if self.clock() - created > self.max_age:
+            return None
+        base = slot * self.max_mentions
+        return MentionRecord(
+            message_id,
+            self.channel_ids[slot],
+            self.guild_ids[slot] or None,
+            self.author_ids[slot],
+            self.mention_ids[base:base + self.mention_counts[slot]].tolist(),
+            created,
+        )
@@ -0,0 +1,137 @@
+"""Single-pass content analyzer for the automod_settings.json toggles.
+
+Every enabled feature contributes one named group to a single compiled
+regex, so a message is tokenised once regardless of how many toggles are on.
+Disabled toggles are left out of the pattern entirely and cost nothing.
+Banned words are the exception: they are matched on the normalized keyword
+text (see ``cogs/_normalize.py``) by a KeywordMatcher, since the regex runs
+on the case-preserving text.
+
+``antiinvite`` and ``antilinks`` are handled by the per-guild link policy in
+``cogs/_link_scanner.py``, and ``antispam`` depends on message history
+rather than content; neither is handled here.
+"""
+
+import json
+import re
+
+from cogs._keyword_matcher import KeywordMatcher
+
+SETTINGS_FILE = "automod_settings.json"
+
+DEFAULT_LIMITS = {
+    "caps_ratio": 0.7,
+    "caps_min_letters": 10,
+    "max_emoji": 10,
+    "max_mentions": 5,
+    "max_newlines": 15,
+}
+
+MENTION_PATTERN = r"<@[!&]?\d+>|@everyone|@here"
+EMOJI_PATTERN = r"<a?:\w+:\d+>|[\u2600-\u27bf\U0001f300-\U0001faff]"
+
+
+def load_settings():
+    try:
+        with open(SETTINGS_FILE, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"enabled": False}
+
+
+class MessageFeatures:
+    __slots__ = ("letters", "caps", "emoji", "mentions", "newlines", "banned")
+
+    def __init__(self):
+        self.letters = 0
+        self.caps = 0
+        self.emoji = 0
+        self.mentions = 0
+        self.newlines = 0
+        self.banned = []
+
+    @property
+    def caps_ratio(self):
+        return self.caps / self.letters if self.letters else 0.0
+
+
+class MessageAnalyzer:
+    def __init__(self, settings=None, normalize=None):
+        self.normalize = normalize
+        self.configure(settings or {})
+
+    def configure(self, settings):
+        """(Re)compile the scanner for the toggles switched on in ``settings``."""
+        self.settings = settings
+        self.enabled = bool(settings.get("enabled"))
+        self.limits = {key: settings.get(key, value) for key, value in DEFAULT_LIMITS.items()}
+
+        groups = []
+        if settings.get("antimention"):
+            groups.append(("mention", MENTION_PATTERN))
+        if settings.get("antiemoji"):
+            groups.append(("emoji", EMOJI_PATTERN))
+        if settings.get("anticaps"):
+            groups.append(("caps", r"[A-Z]+"))
+            groups.append(("lower", r"[a-z]+"))
+        if settings.get("antinewlines"):
+            groups.append(("newline", r"\n"))
+
+        self._pattern = None
+        if self.enabled and groups:
+            self._pattern = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in groups))
+
+        self._banned = None
+        if self.enabled and settings.get("anticuss"):
+            words = {word: {"keywords": [word]} for word in settings.get("banned_words", []) if word}
+            if words:
+                self._banned = KeywordMatcher(words, self.normalize)
+
+    def analyze(self, content, keyword_text=None):
+        """Scan ``content`` once and return its MessageFeatures.
+
+        ``keyword_text`` is the normalized form used for banned words and
+        defaults to ``content`` itself.
+        """
+        features = MessageFeatures()
+        if self._banned is not None:
+            if keyword_text is None:
+                keyword_text = self.normalize(content) if self.normalize else content
+            features.banned = list(self._banned.scan(keyword_text))
+        if self._pattern is None:
+            return features
+
+        for match in self._pattern.finditer(content):
+            kind = match.lastgroup
+            if kind == "lower":
+                features.letters += match.end() - match.start()
+            elif kind == "caps":
+                size = match.end() - match.start()
+                features.letters += size
+                features.caps += size
+            elif kind == "newline":
+                features.newlines += 1
+            elif kind == "mention":
+                features.mentions += 1
+            elif kind == "emoji":
+                features.emoji += 1
+        return features
+
+    def check(self, content, keyword_text=None):
+        """Return a reason string for the first toggle ``content`` violates, or None."""
+        if self._pattern is None and self._banned is None:
+            return None
+
+        features = self.analyze(content, keyword_text)
+        limits = self.limits
+        if features.banned:
+            return f"Banned word: {features.banned[0]}"
+        if features.mentions > limits["max_mentions"]:
+            return f"Mass mention ({features.mentions})"
+        if features.emoji > limits["max_emoji"]:
+            return f"Emoji spam ({features.emoji})"
+        if features.newlines > limits["max_newlines"]:
+            return f"Too many lines ({features.newlines})"
+        if features.letters >= limits["caps_min_letters"] and features.caps_ratio >= limits["caps_ratio"]:
+            return f"Excessive caps ({features.caps_ratio:.0%})"
+        return None
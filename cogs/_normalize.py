@@ -0,0 +1,115 @@
+"""Text normalization in front of AutoMod keyword matching.
+
+Two ``str.translate`` tables are built once when the cog loads:
+
+* ``fold`` strips zero-width and combining characters and maps fullwidth
+  forms, accented Latin letters, mathematical alphanumerics and common
+  Cyrillic/Greek homoglyphs to plain ASCII. It keeps case, so the analyzer
+  can still count capitals and spot links on the folded text.
+* ``keyword`` additionally lowercases and collapses leetspeak look-alikes
+  into one canonical letter (``1``, ``l``, ``|`` and ``!`` all become ``i``,
+  ``$`` and ``5`` become ``s`` ...). Keywords go through the same table, so
+  ``a$$h0le`` and ``asshole`` meet in the middle.
+
+All per-character work happens inside ``translate``. Plain ASCII input, by
+far the common case, skips the fold table and goes through a 256-byte
+``bytes.translate`` table, which is several times faster than the dict
+based ``str.translate``.
+"""
+
+import unicodedata
+
+ZERO_WIDTH = "\u00ad\u034f\u061c\u115f\u1160\u17b4\u17b5\u180e\u200b\u200c\u200d\u200e\u200f\u2060\u2061\u2062\u2063\u2064\ufeff"
+
+HOMOGLYPHS = {
+    # Cyrillic
+    "\u0430": "a", "\u0432": "b", "\u0435": "e", "\u0451": "e", "\u043a": "k", "\u043c": "m", "\u043d": "h", "\u043e": "o", "\u0440": "p",
+    "\u0441": "c", "\u0442": "t", "\u0443": "y", "\u0445": "x", "\u0455": "s", "\u0456": "i", "\u0457": "i", "\u0458": "j", "\u04bb": "h",
+    "\u0501": "d", "\u051b": "q", "\u051d": "w", "\u04cf": "l", "\u0261": "g",
+    "\u0410": "A", "\u0412": "B", "\u0415": "E", "\u0401": "E", "\u041a": "K", "\u041c": "M", "\u041d": "H", "\u041e": "O", "\u0420": "P",
+    "\u0421": "C", "\u0422": "T", "\u0423": "Y", "\u0425": "X", "\u0405": "S", "\u0406": "I", "\u0407": "I", "\u0408": "J", "\u04ba": "H",
+    "\u0500": "D", "\u051a": "Q", "\u051c": "W", "\u04c0": "I",
+    # Greek
+    "\u03b1": "a", "\u03b2": "b", "\u03b5": "e", "\u03b9": "i", "\u03ba": "k", "\u03bd": "v", "\u03bf": "o", "\u03c1": "p", "\u03c4": "t",
+    "\u03c5": "u", "\u03c7": "x", "\u0391": "A", "\u0392": "B", "\u0395": "E", "\u0396": "Z", "\u0397": "H", "\u0399": "I", "\u039a": "K",
+    "\u039c": "M", "\u039d": "N", "\u039f": "O", "\u03a1": "P", "\u03a4": "T", "\u03a5": "Y", "\u03a7": "X",
+}
+
+# Every character of a group is rewritten to the group's first letter.
+# Only digits and symbols are folded: treating the letter l as i would turn
+# ordinary words into other ones ("heil" -> "hell").
+LEET_GROUPS = ["a@4", "b8", "e3", "g9", "i1|!", "o0", "s$5", "t7+"]
+
+# Ranges whose compatibility decomposition gives away a plain ASCII letter.
+DECOMPOSE_RANGES = [
+    (0x00C0, 0x024F),    # Latin-1 supplement, Latin extended A/B
+    (0x1E00, 0x1EFF),    # Latin extended additional
+    (0x2460, 0x24FF),    # enclosed alphanumerics
+    (0xFF01, 0xFF5E),    # fullwidth ASCII
+    (0x1D400, 0x1D7FF),  # mathematical alphanumerics
+    (0x1F130, 0x1F189),  # squared/negative circled letters
+]
+
+
+def _ascii_skeleton(ch):
+    decomposed = unicodedata.normalize("NFKD", ch)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    if len(stripped) == 1 and stripped.isascii() and stripped.isprintable():
+        return stripped
+    return None
+
+
+def build_fold_table():
+    table = {ord(ch): None for ch in ZERO_WIDTH}
+    # Combining marks (zalgo text, accents typed separately).
+    for code in range(0x0300, 0x0370):
+        table[code] = None
+    for start, end in DECOMPOSE_RANGES:
+        for code in range(start, end + 1):
+            skeleton = _ascii_skeleton(chr(code))
+            if skeleton is not None:
+                table[code] = skeleton
+    for ch, replacement in HOMOGLYPHS.items():
+        table[ord(ch)] = replacement
+    return table
+
+
+def build_keyword_table(fold):
+    canonical = {ch: group[0] for group in LEET_GROUPS for ch in group}
+    leet = {}
+    for code in range(128):
+        ch = chr(code).lower()
+        leet[code] = canonical.get(ch, ch)
+    table = dict(leet)
+    # Lowercase the rest of the BMP too, so matched text never needs .lower().
+    for code in range(128, 0x10000):
+        ch = chr(code)
+        lowered = ch.lower()
+        if lowered != ch:
+            table[code] = lowered
+    # Compose fold -> leet so one translate does both for non-ASCII input.
+    for code, replacement in fold.items():
+        if replacement is None:
+            table[code] = None
+        else:
+            table[code] = "".join(leet.get(ord(c), c) for c in replacement)
+    return leet, table
+
+
+class Normalizer:
+    def __init__(self):
+        self.fold_table = build_fold_table()
+        self.leet_table, self.keyword_table = build_keyword_table(self.fold_table)
+        self.ascii_table = bytes(ord(self.leet_table.get(code, chr(code))) for code in range(256))
+
+    def fold(self, text):
+        """Case-preserving ASCII skeleton of ``text``."""
+        if text.isascii():
+            return text
+        return text.translate(self.fold_table)
+
+    def keywords(self, text):
+        """Lowercased, de-leeted skeleton used for keyword matching."""
+        if text.isascii():
+            return text.encode("ascii").translate(self.ascii_table).decode("ascii")
+        return text.translate(self.keyword_table)
@@ -0,0 +1,136 @@
+"""Content-addressed cache of finished card images.
+
+A card is identified by a digest of everything that goes into it (template
+version, avatar key, text, output settings), so a repeat render can upload
+the stored bytes without touching Pillow. Entries live in a small in-memory
+LRU and on disk as ``<digest>.<ext>``. Disk writes go to a temp file and are
+renamed into place, so a crash never leaves a half-written image, and the
+directory is kept under ``max_disk_bytes`` by evicting the least recently
+used entries. Only files named like digests are managed; anything else in
+the directory is left alone.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+
+DIGEST_FILE = re.compile(r"^([0-9a-f]{32})\.(png|webp|jpg|gif)$")
+
+
+def cache_key(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+class RenderCache:
+    def __init__(self, directory, max_memory_bytes=16 * 1024 * 1024, max_disk_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.counts = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self._memory = OrderedDict()
+        self._disk = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            match = DIGEST_FILE.match(entry.name)
+            if match:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, match.group(1), match.group(2), stat.st_size))
+        for _, key, ext, size in sorted(entries):
+            self._disk[key] = (ext, size)
+            self.disk_bytes += size
+
+    def _path(self, key, ext):
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    async def get(self, key):
+        """``(data, ext)`` for ``key``, or None."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self.counts["hits"] += 1
+            return entry
+
+        disk = self._disk.get(key)
+        if disk is not None:
+            ext, _ = disk
+            try:
+                data = await asyncio.to_thread(self._read, self._path(key, ext))
+            except OSError:
+                self._drop_disk(key)
+            else:
+                self._disk.move_to_end(key)
+                self.counts["disk_hits"] += 1
+                self._remember(key, data, ext)
+                return data, ext
+
+        self.counts["misses"] += 1
+        return None
+
+    async def put(self, key, data, ext):
+        self._remember(key, data, ext)
+        try:
+            await asyncio.to_thread(self._write, self._path(key, ext), data)
+        except OSError as e:
+            print("[Render Cache Error]", e)
+            return
+        old = self._disk.pop(key, None)
+        if old is not None:
+            self.disk_bytes -= old[1]
+        self._disk[key] = (ext, len(data))
+        self.disk_bytes += len(data)
+        while self.disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+            oldest = next(iter(self._disk))
+            self._drop_disk(oldest, remove=True)
+            self.counts["evictions"] += 1
+
+    def _remember(self, key, data, ext):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self.memory_bytes -= len(old[0])
+        self._memory[key] = (data, ext)
+        self.memory_bytes += len(data)
+        while self.memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+
+    def _drop_disk(self, key, remove=False):
+        ext, size = self._disk.pop(key)
+        self.disk_bytes -= size
+        if remove:
+            try:
+                os.remove(self._path(key, ext))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _read(path):
+        with open(path, "rb") as f:
+            data = f.read()
+        # Bump the mtime so the LRU order survives a restart.
+        os.utime(path)
+        return data
+
+    @staticmethod
+    def _write(path, data):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def stats(self):
+        return dict(
+            self.counts,
+            memory_entries=len(self._memory),
+            memory_bytes=self.memory_bytes,
+            disk_entries=len(self._disk),
+            disk_bytes=self.disk_bytes,
+        )
@@ -0,0 +1,125 @@
+"""Process-pool rendering for image cards.
+
+Pillow holds the GIL for most of a resize/filter/PNG encode, so rendering
+on the event loop stalls the gateway heartbeat and every other cog. Cogs
+build a render spec (see ``cogs._cards``) and ``await renderer.render(spec)``;
+the work runs in a ``ProcessPoolExecutor`` and only the encoded image comes
+back.
+
+At most ``max_pending`` renders are in flight; further callers wait for a
+slot, which keeps a join raid from queueing thousands of avatars in memory.
+The worker count comes from the ``RENDER_WORKERS`` environment variable.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from cogs._animated_cards import render_animated
+from cogs._cards import render as render_card
+
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+# By the time the pool starts the bot has threads and open gateway/HTTP
+# sockets; forking it would hand those to the workers. Start them clean.
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _run(spec):
+    start = time.perf_counter()
+    encoded = render_animated(spec) if spec.get("animated") else render_card(spec)
+    return encoded, time.perf_counter() - start
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return 0.0, 0.0
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+class RenderService:
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or int(os.getenv("RENDER_WORKERS", DEFAULT_WORKERS))
+        self.max_pending = max_pending or self.workers * 4
+        self.render_times = deque(maxlen=512)
+        self.total_times = deque(maxlen=512)
+        self.encode_times = deque(maxlen=512)
+        self.counts = {"rendered": 0, "failed": 0, "waited": 0, "bytes_out": 0, "bytes_saved": 0}
+        self.formats = {}
+        self._pool = None
+        self._slots = None
+        self._in_flight = 0
+        self._users = 0
+
+    def acquire(self):
+        """Called from cog_load; the pool lives while any cog holds it."""
+        self._users += 1
+
+    def release(self):
+        self._users = max(0, self._users - 1)
+        if not self._users:
+            self.shutdown()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def render(self, spec):
+        """Render ``spec`` in a worker process and return the ``Encoded`` image."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        queued = time.perf_counter()
+        if self._slots.locked():
+            self.counts["waited"] += 1
+        async with self._slots:
+            self._in_flight += 1
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(START_METHOD)
+                )
+            loop = asyncio.get_running_loop()
+            try:
+                encoded, elapsed = await loop.run_in_executor(self._pool, _run, spec)
+            except BrokenProcessPool:
+                # A worker died (OOM on a huge avatar); start a fresh pool next time.
+                self.shutdown()
+                self.counts["failed"] += 1
+                raise
+            except Exception:
+                self.counts["failed"] += 1
+                raise
+            finally:
+                self._in_flight -= 1
+        self.counts["rendered"] += 1
+        self.counts["bytes_out"] += len(encoded.data)
+        self.counts["bytes_saved"] += encoded.saved
+        self.formats[encoded.format] = self.formats.get(encoded.format, 0) + 1
+        self.render_times.append(elapsed)
+        self.encode_times.append(encoded.seconds)
+        self.total_times.append(time.perf_counter() - queued)
+        return encoded
+
+    def stats(self):
+        render_p50, render_p99 = _percentiles(self.render_times)
+        total_p50, total_p99 = _percentiles(self.total_times)
+        encode_p50, encode_p99 = _percentiles(self.encode_times)
+        return dict(
+            self.counts,
+            workers=self.workers,
+            in_flight=self._in_flight,
+            render_p50_ms=render_p50 * 1000,
+            render_p99_ms=render_p99 * 1000,
+            total_p50_ms=total_p50 * 1000,
+            total_p99_ms=total_p99 * 1000,
+            encode_p50_ms=encode_p50 * 1000,
+            encode_p99_ms=encode_p99 * 1000,
+            formats=dict(self.formats),
+        )
+
+
+renderer = RenderService()
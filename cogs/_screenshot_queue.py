@@ -0,0 +1,210 @@
+"""Scheduler in front of the screenshot browser pool.
+
+``ScreenshotQueue.submit`` charges the caller's per-user and per-guild token
+buckets and queues the job; at most ``concurrency`` jobs run at once and the
+rest wait in submission order. Each job knows the monotonic time its
+interaction token stops working. Whenever the queue moves, waiting jobs get
+their new position and ETA through ``on_position``, and any job that could no
+longer finish before its token expires is dropped with ``JobExpired`` rather
+than run for a reply nobody could send.
+
+ETAs come from a moving average of how long recent jobs took to run.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+
+import discord
+
+INTERACTION_TTL = 15 * 60
+# Time left after a job finishes to upload the result.
+EXPIRY_MARGIN = 30.0
+DEFAULT_DURATION = 5.0
+
+
+def interaction_deadline(interaction, clock=time.monotonic):
+    """Time on ``clock`` by which a job must finish for ``interaction`` to still be answerable."""
+    age = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    return clock() + INTERACTION_TTL - age - EXPIRY_MARGIN
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, scope, retry_after):
+        super().__init__(f"{scope} screenshot limit reached, retry in {retry_after:.0f}s")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class JobExpired(Exception):
+    pass
+
+
+class TokenBuckets:
+    """One token bucket per key: ``capacity`` tokens, refilled at one per ``per / capacity`` seconds."""
+
+    def __init__(self, capacity, per, max_keys=10_000, clock=time.monotonic):
+        self.capacity = capacity
+        self.rate = capacity / per
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = {}
+
+    def _tokens(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def retry_after(self, key):
+        """Seconds until ``key`` has a token; 0 if it has one now."""
+        tokens = self._tokens(key, self.clock())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def take(self, key):
+        now = self.clock()
+        self._buckets[key] = (self._tokens(key, now) - 1, now)
+        if len(self._buckets) > self.max_keys:
+            # Full buckets carry no state worth keeping.
+            self._buckets = {k: v for k, v in self._buckets.items() if self._tokens(k, now) < self.capacity}
+
+
+class Job:
+    __slots__ = ("user_id", "guild_id", "run", "deadline", "on_position", "future", "task", "position")
+
+    def __init__(self, user_id, guild_id, run, deadline, on_position):
+        self.user_id = user_id
+        self.guild_id = guild_id
+        self.run = run
+        self.deadline = deadline
+        self.on_position = on_position
+        self.future = asyncio.get_running_loop().create_future()
+        self.task = None
+        # 0 once running, otherwise 1-based place among waiting jobs.
+        self.position = None
+
+    async def wait(self):
+        """The value returned by ``run``, or the exception it (or the queue) raised."""
+        return await asyncio.shield(self.future)
+
+
+class ScreenshotQueue:
+    def __init__(self, concurrency=3, user_quota=(3, 60.0), guild_quota=(10, 60.0), max_waiting=50,
+                 clock=time.monotonic):
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.clock = clock
+        self.users = TokenBuckets(*user_quota, clock=clock)
+        self.guilds = TokenBuckets(*guild_quota, clock=clock)
+        self.avg_duration = DEFAULT_DURATION
+        self.counts = {"submitted": 0, "completed": 0, "failed": 0, "expired": 0, "rejected": 0}
+        self._waiting = deque()
+        self._running = set()
+
+    def eta(self, position):
+        """Seconds until a job at ``position`` would be finished."""
+        if position == 0:
+            return self.avg_duration
+        return (math.ceil(position / self.concurrency) + 1) * self.avg_duration
+
+    def submit(self, user_id, guild_id, run, deadline, on_position=None):
+        """Queue ``run()`` and return its ``Job``; raises QuotaExceeded without charging anything."""
+        if len(self._waiting) >= self.max_waiting:
+            self.counts["rejected"] += 1
+            raise QuotaExceeded("queue", self.eta(len(self._waiting)))
+        checks = [("user", self.users, user_id)]
+        if guild_id is not None:
+            checks.append(("guild", self.guilds, guild_id))
+        for scope, buckets, key in checks:
+            retry_after = buckets.retry_after(key)
+            if retry_after:
+                self.counts["rejected"] += 1
+                raise QuotaExceeded(scope, retry_after)
+        for _, buckets, key in checks:
+            buckets.take(key)
+
+        job = Job(user_id, guild_id, run, deadline, on_position)
+        self.counts["submitted"] += 1
+        self._waiting.append(job)
+        job.position = len(self._waiting)
+        if self.clock() + self.eta(job.position) > deadline:
+            self._waiting.pop()
+            self._expire(job)
+            return job
+        self._pump(notify=False)
+        return job
+
+    def cancel(self, job):
+        if job in self._waiting:
+            self._waiting.remove(job)
+            job.future.cancel()
+            self._pump()
+        elif job.task is not None:
+            job.task.cancel()
+
+    def close(self):
+        for job in list(self._waiting) + list(self._running):
+            self.cancel(job)
+
+    def _expire(self, job):
+        self.counts["expired"] += 1
+        if not job.future.done():
+            job.future.set_exception(JobExpired("the interaction would expire before the screenshot was ready"))
+
+    def _pump(self, notify=True):
+        while self._waiting and len(self._running) < self.concurrency:
+            job = self._waiting.popleft()
+            if self.clock() + self.eta(0) > job.deadline:
+                self._expire(job)
+                continue
+            self._running.add(job)
+            job.position = 0
+            job.task = asyncio.create_task(self._execute(job))
+            if notify:
+                self._notify(job)
+
+        now = self.clock()
+        still_waiting = deque()
+        for job in self._waiting:
+            position = len(still_waiting) + 1
+            if now + self.eta(position) > job.deadline:
+                self._expire(job)
+                continue
+            still_waiting.append(job)
+            if position != job.position:
+                job.position = position
+                if notify:
+                    self._notify(job)
+        self._waiting = still_waiting
+
+    def _notify(self, job):
+        if job.on_position is not None:
+            asyncio.create_task(self._call(job.on_position, job.position, self.eta(job.position)))
+
+    @staticmethod
+    async def _call(callback, position, eta):
+        try:
+            await callback(position, eta)
+        except Exception as e:
+            print("[Screenshot Queue Error]", e)
+
+    async def _execute(self, job):
+        started = self.clock()
+        try:
+            result = await job.run()
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        except Exception as e:
+            self.counts["failed"] += 1
+            job.future.set_exception(e)
+        else:
+            self.counts["completed"] += 1
+            job.future.set_result(result)
+            self.avg_duration += (self.clock() - started - self.avg_duration) * 0.2
+        finally:
+            self._running.discard(job)
+            self._pump()
+
+    def stats(self):
+        return dict(self.counts, running=len(self._running), waiting=len(self._waiting),
+                    avg_seconds=round(self.avg_duration, 2))
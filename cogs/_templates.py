@@ -0,0 +1,68 @@
+"""Shared cache of card templates (base images and fonts).
+
+Base images are decoded and converted to RGBA once and handed out as copies,
+which is a memcpy rather than a PNG decode. Fonts are parsed once per
+(path, size); FreeTypeFont objects are never modified while drawing, so the
+same one is shared. Each lookup stats the file and reloads it if its mtime
+changed, so swapping an asset on disk needs no restart.
+"""
+
+import os
+import threading
+
+from PIL import Image, ImageFont
+
+
+class TemplateCache:
+    def __init__(self):
+        self._images = {}
+        self._fonts = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+
+    def _mtime(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            # Let the loader raise the real error (or resolve a system font).
+            return None
+
+    def _get(self, cache, key, path, load):
+        mtime = self._mtime(path)
+        with self._lock:
+            entry = cache.get(key)
+            if entry is not None and entry[0] == mtime and mtime is not None:
+                self.hits += 1
+                return entry[1]
+        value = load()
+        with self._lock:
+            cache[key] = (mtime, value)
+            self.loads += 1
+        return value
+
+    def base(self, path):
+        """The template at ``path`` as RGBA; shared, don't draw on it."""
+        def load():
+            with Image.open(path) as img:
+                return img.convert("RGBA")
+        return self._get(self._images, path, path, load)
+
+    def version(self, path):
+        """Changes whenever the file at ``path`` does; for keying caches of rendered output."""
+        return self._mtime(path)
+
+    def image(self, path):
+        """A private RGBA copy of the template at ``path`` to draw on."""
+        return self.base(path).copy()
+
+    def font(self, path, size):
+        return self._get(self._fonts, (path, size), path, lambda: ImageFont.truetype(path, size))
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._fonts.clear()
+
+
+templates = TemplateCache()
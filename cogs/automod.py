@@ -2,122 +2,378 @@ import discord
 from discord.ext import commands, tasks
 import json
 import asyncio
-from datetime import datetime, timedelta
+
+from cogs._action_queue import ActionExecutor
+from cogs._antispam import SpamDetector
+from cogs._cooldowns import CooldownStore
+from cogs._digest_log import DEFAULT_WINDOW, DigestLogger
+from cogs._image_hash import MAX_IMAGE_BYTES, ImageHashIndex, dhash
+from cogs._keyword_matcher import MatcherCache
+from cogs._link_scanner import LinkPolicy, extract_links
+from cogs._message_analyzer import MessageAnalyzer, load_settings
+from cogs._normalize import Normalizer
+
+RULES_FILE = "automod_rules.json"
+CONFIG_FILE = "config.json"
+# Rules and config written before they were split per guild live under this
+# key and apply to every guild that hasn't set up its own.
+DEFAULT_KEY = "default"
+COOLDOWN_SCOPES = ("user", "guild", "rule")
+DEFAULT_COOLDOWN = 10
+
 
 class AutoMod(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.rules = self.load_rules()
-        self.cooldowns = {}
+        self.normalizer = Normalizer()
+        self.matchers = MatcherCache(idle_seconds=1800, normalize=self.normalizer.keywords)
+        self.settings = load_settings()
+        self.analyzer = MessageAnalyzer(self.settings, normalize=self.normalizer.keywords)
+        self.link_policies = {}
+        self.spam = None
+        if self.settings.get("enabled") and self.settings.get("antispam"):
+            self.spam = SpamDetector(self.settings)
+        self.image_index = None
+        if self.settings.get("enabled") and self.settings.get("antiimagespam"):
+            self.image_index = ImageHashIndex(max_distance=self.settings.get("image_distance", 6))
+        self.cooldowns = CooldownStore(max_entries=50_000)
+        self.executor = ActionExecutor()
+        self.digest = DigestLogger(self.log_target)
         self.load_config()
 
+    async def cog_load(self):
+        self.executor.start()
+        self.housekeeping.start()
+
+    async def cog_unload(self):
+        self.housekeeping.cancel()
+        await self.executor.stop()
+        await self.digest.close()
+
     def load_rules(self):
         try:
-            with open("automod_rules.json", "r") as f:
-                return json.load(f)
+            with open(RULES_FILE, "r") as f:
+                rules = json.load(f)
         except FileNotFoundError:
             return {}
+        # Old files were a flat {name: rule} dict shared by every guild.
+        if any(isinstance(rule, dict) and "keywords" in rule for rule in rules.values()):
+            rules = {DEFAULT_KEY: rules}
+        return rules
 
-    def save_rules(self):
-        with open("automod_rules.json", "w") as f:
+    def save_rules(self, guild_id):
+        with open(RULES_FILE, "w") as f:
             json.dump(self.rules, f, indent=4)
+        # Only recompile when the rule set actually changes.
+        self.matchers.invalidate(self.rules_key(guild_id))
+
+    def rules_key(self, guild_id):
+        """Key of the rule set ``guild_id`` uses: its own, or the shared defaults."""
+        key = str(guild_id)
+        return key if key in self.rules else DEFAULT_KEY
+
+    def rules_for(self, guild_id):
+        return self.rules.get(self.rules_key(guild_id), {})
+
+    def editable_rules_for(self, guild_id):
+        key = str(guild_id)
+        if key not in self.rules:
+            self.rules[key] = dict(self.rules.get(DEFAULT_KEY, {}))
+        return self.rules[key]
 
     def load_config(self):
         try:
-            with open("config.json", "r") as f:
+            with open(CONFIG_FILE, "r") as f:
                 self.config = json.load(f)
         except FileNotFoundError:
-            self.config = {"log_channel": None}
+            self.config = {}
+        if "log_channel" in self.config:
+            self.config = {DEFAULT_KEY: self.config}
 
-    async def log_action(self, guild, message, reason):
-        log_channel_id = self.config.get("log_channel")
-        if not log_channel_id:
-            return
-        channel = guild.get_channel(log_channel_id)
-        if channel:
-            await channel.send(f"[AutoMod] {message.author.mention} triggered rule: {reason}\nContent: `{message.content}`")
+    def save_config(self):
+        with open(CONFIG_FILE, "w") as f:
+            json.dump(self.config, f, indent=4)
+
+    def config_for(self, guild_id):
+        return self.config.get(str(guild_id), self.config.get(DEFAULT_KEY, {}))
+
+    def link_policy_for(self, guild_id):
+        policy = self.link_policies.get(guild_id)
+        if policy is None:
+            conf = self.config_for(guild_id)
+            enabled = bool(self.settings.get("enabled"))
+            policy = self.link_policies[guild_id] = LinkPolicy(
+                allow=conf.get("link_allow", []),
+                deny=conf.get("link_deny", []),
+                block_links=enabled and bool(self.settings.get("antilinks")),
+                block_invites=enabled and bool(self.settings.get("antiinvite")),
+            )
+        return policy
 
-    def is_on_cooldown(self, user_id):
-        now = datetime.utcnow()
-        if user_id in self.cooldowns:
-            cooldown_end = self.cooldowns[user_id]
-            if now < cooldown_end:
-                return True
-        return False
+    def message_links(self, message, content):
+        links = extract_links(content)
+        for embed in message.embeds:
+            for text in (embed.url, embed.description, *(field.value for field in embed.fields)):
+                if text:
+                    links.extend(extract_links(self.normalizer.fold(text)))
+        for attachment in message.attachments:
+            links.extend(extract_links(attachment.url))
+        return links
 
-    def set_cooldown(self, user_id, seconds=10):
-        self.cooldowns[user_id] = datetime.utcnow() + timedelta(seconds=seconds)
+    def log_target(self, guild):
+        conf = self.config_for(guild.id)
+        log_channel_id = conf.get("log_channel")
+        channel = guild.get_channel(log_channel_id) if log_channel_id else None
+        return channel, conf.get("log_window", DEFAULT_WINDOW)
+
+    def log_action(self, guild, message, reason, rule_name=None):
+        # Hits are buffered and posted as one digest per window, grouped by
+        # rule; the reason often carries per-message numbers.
+        self.digest.add(guild, message, rule_name or reason, reason)
+
+    def cooldown_key(self, message, rule_name=None):
+        """Key the cooldown by user, by (guild, user) or by (guild, rule, user)."""
+        scope = self.config_for(message.guild.id).get("cooldown_scope", "user")
+        if scope == "guild":
+            return (message.guild.id, message.author.id)
+        if scope == "rule":
+            return (message.guild.id, rule_name, message.author.id)
+        return message.author.id
+
+    def is_on_cooldown(self, message, rule_name=None):
+        return self.cooldowns.is_active(self.cooldown_key(message, rule_name))
+
+    def set_cooldown(self, message, rule_name=None, seconds=None):
+        if seconds is None:
+            seconds = self.config_for(message.guild.id).get("cooldown_seconds", DEFAULT_COOLDOWN)
+        self.cooldowns.set(self.cooldown_key(message, rule_name), seconds)
+
+    @tasks.loop(minutes=5)
+    async def housekeeping(self):
+        self.matchers.evict_idle()
+        self.cooldowns.sweep()
+        if self.spam is not None:
+            self.spam.sweep()
 
     @commands.Cog.listener()
     async def on_message(self, message):
-        if message.author.bot:
+        if message.author.bot or message.guild is None:
+            return
+
+        # Zero-width characters, homoglyphs and leetspeak are folded away
+        # before anything looks at the content.
+        content = self.normalizer.fold(message.content)
+        keyword_text = self.normalizer.keywords(message.content)
+
+        # Record before the cooldown check so the spam window sees every message.
+        spam_reason = None
+        if self.spam is not None:
+            spam_reason = self.spam.record(message.channel.id, message.author.id, keyword_text)
+
+        # Per-rule cooldowns can only be checked once we know which rule hit.
+        per_rule = self.config_for(message.guild.id).get("cooldown_scope") == "rule"
+        if not per_rule and self.is_on_cooldown(message):
             return
 
-        if self.is_on_cooldown(message.author.id):
+        if spam_reason is not None:
+            if not (per_rule and self.is_on_cooldown(message, "antispam")):
+                self.apply_action(message, self.settings.get("spam_action", "timeout"), spam_reason, "antispam")
             return
 
-        for rule in self.rules.values():
-            for keyword in rule["keywords"]:
-                if keyword.lower() in message.content.lower():
-                    action = rule.get("action", "delete")
-                    reason = rule.get("reason", keyword)
-                    if action == "delete":
-                        await message.delete()
-                    elif action == "warn":
-                        await message.channel.send(f"{message.author.mention}, please avoid saying that.", delete_after=5)
-                    elif action == "timeout":
-                        if isinstance(message.author, discord.Member):
-                            until = discord.utils.utcnow() + timedelta(seconds=30)
-                            await message.author.timeout(until, reason=reason)
-
-                    await self.log_action(message.guild, message, reason)
-                    self.set_cooldown(message.author.id)
+        rules = self.rules_for(message.guild.id)
+        if rules:
+            # Guilds on the default rules share one compiled matcher.
+            matcher = self.matchers.get(self.rules_key(message.guild.id), rules)
+            hit = matcher.first_match(keyword_text)
+            if hit is not None:
+                name, keyword = hit
+                if per_rule and self.is_on_cooldown(message, name):
                     return
+                rule = rules[name]
+                self.apply_action(message, rule.get("action", "delete"), rule.get("reason", keyword), name, rule.get("cooldown"))
+                return
+
+        policy = self.link_policy_for(message.guild.id)
+        if policy.active:
+            reason = policy.check(self.message_links(message, content))
+            if reason is not None:
+                if per_rule and self.is_on_cooldown(message, "links"):
+                    return
+                self.apply_action(message, self.settings.get("action", "delete"), reason, "links")
+                return
+
+        reason = self.analyzer.check(content, keyword_text)
+        if reason is not None:
+            if per_rule and self.is_on_cooldown(message, "settings"):
+                return
+            self.apply_action(message, self.settings.get("action", "delete"), reason, "settings")
+            return
+
+        if self.image_index is not None and message.attachments:
+            reason = await self.check_images(message)
+            if reason is not None:
+                if per_rule and self.is_on_cooldown(message, "images"):
+                    return
+                self.apply_action(message, self.settings.get("action", "delete"), reason, "images")
+
+    async def check_images(self, message):
+        repeats = self.settings.get("image_repeats", 3)
+        for attachment in message.attachments:
+            if not (attachment.content_type or "").startswith("image/") or attachment.size > MAX_IMAGE_BYTES:
+                continue
+            try:
+                data = await attachment.read()
+                # Decoding and resizing stay off the event loop.
+                image_hash = await asyncio.to_thread(dhash, data)
+            except Exception as e:
+                print("[AutoMod Image Error]", e)
+                continue
+            posts, authors = self.image_index.add(message.guild.id, image_hash, message.author.id)
+            if posts >= repeats:
+                return f"Repeated image ({posts} posts by {authors} user(s))"
+        return None
+
+    def apply_action(self, message, action, reason, rule_name=None, cooldown=None):
+        # The REST calls happen on the executor's worker; the cooldown is set
+        # right away so follow-up messages aren't queued a second time.
+        self.executor.submit(message, action, reason)
+        self.log_action(message.guild, message, reason, rule_name)
+        self.set_cooldown(message, rule_name, cooldown)
 
     @commands.command()
+    @commands.guild_only()
     @commands.has_permissions(manage_messages=True)
     async def addrule(self, ctx, name: str, action: str, *, keywords: str):
-        """Add a new AutoMod rule."
+        """Add a new AutoMod rule for this server.
         Actions: delete, warn, timeout"""
-        self.rules[name] = {
+        rules = self.editable_rules_for(ctx.guild.id)
+        rules[name] = {
             "action": action.lower(),
             "keywords": [k.strip() for k in keywords.split(",")],
             "reason": f"Rule {name} triggered"
         }
-        self.save_rules()
+        self.save_rules(ctx.guild.id)
         await ctx.send(f"Rule `{name}` added with action `{action}`.")
 
     @commands.command()
+    @commands.guild_only()
     @commands.has_permissions(manage_messages=True)
     async def removerule(self, ctx, name: str):
-        """Remove an AutoMod rule by name."""
-        if name in self.rules:
-            del self.rules[name]
-            self.save_rules()
+        """Remove an AutoMod rule from this server by name."""
+        if name in self.rules_for(ctx.guild.id):
+            del self.editable_rules_for(ctx.guild.id)[name]
+            self.save_rules(ctx.guild.id)
             await ctx.send(f"Rule `{name}` removed.")
         else:
             await ctx.send("No such rule found.")
 
     @commands.command()
+    @commands.guild_only()
     async def listrules(self, ctx):
-        """List all active AutoMod rules."""
-        if not self.rules:
+        """List all active AutoMod rules in this server."""
+        rules = self.rules_for(ctx.guild.id)
+        if not rules:
             await ctx.send("No rules active.")
             return
         desc = ""
-        for name, rule in self.rules.items():
+        for name, rule in rules.items():
             desc += f"**{name}** — `{rule['action']}` for: {', '.join(rule['keywords'])}\n"
         await ctx.send(desc)
 
     @commands.command()
+    @commands.guild_only()
     @commands.has_permissions(administrator=True)
     async def setlog(self, ctx, channel: discord.TextChannel):
-        """Set the AutoMod log channel."""
-        self.config["log_channel"] = channel.id
-        with open("config.json", "w") as f:
-            json.dump(self.config, f, indent=4)
+        """Set the AutoMod log channel for this server."""
+        self.config.setdefault(str(ctx.guild.id), {})["log_channel"] = channel.id
+        self.save_config()
         await ctx.send(f"Log channel set to {channel.mention}")
 
+    @commands.command()
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def setlogwindow(self, ctx, seconds: int):
+        """Set how many seconds of AutoMod hits are collected into one log digest."""
+        seconds = max(0, seconds)
+        self.config.setdefault(str(ctx.guild.id), {})["log_window"] = seconds
+        self.save_config()
+        await ctx.send(f"AutoMod log digests will be posted every {seconds}s.")
+
+    @commands.command()
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def setcooldown(self, ctx, scope: str, seconds: int = DEFAULT_COOLDOWN):
+        """Set how AutoMod cooldowns are shared in this server.
+        Scopes: user (across servers), guild, rule"""
+        scope = scope.lower()
+        if scope not in COOLDOWN_SCOPES:
+            await ctx.send(f"Scope must be one of: {', '.join(COOLDOWN_SCOPES)}")
+            return
+        conf = self.config.setdefault(str(ctx.guild.id), {})
+        conf["cooldown_scope"] = scope
+        conf["cooldown_seconds"] = seconds
+        self.save_config()
+        await ctx.send(f"Cooldown set to {seconds}s per `{scope}`.")
+
+    def edit_link_list(self, guild_id, domain, target):
+        domain = domain.lower().strip().strip(".")
+        conf = self.config.setdefault(str(guild_id), {})
+        for key in ("link_allow", "link_deny"):
+            entries = conf.setdefault(key, [])
+            if domain in entries:
+                entries.remove(domain)
+            if key == target:
+                entries.append(domain)
+        self.save_config()
+        self.link_policies.pop(guild_id, None)
+        return domain
+
+    @commands.command()
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    async def linkallow(self, ctx, domain: str):
+        """Always allow links to a domain (and its subdomains) in this server."""
+        domain = self.edit_link_list(ctx.guild.id, domain, "link_allow")
+        await ctx.send(f"Links to `{domain}` are now allowed.")
+
+    @commands.command()
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    async def linkdeny(self, ctx, domain: str):
+        """Block links to a domain (and its subdomains) in this server."""
+        domain = self.edit_link_list(ctx.guild.id, domain, "link_deny")
+        await ctx.send(f"Links to `{domain}` are now blocked.")
+
+    @commands.command()
+    @commands.guild_only()
+    @commands.has_permissions(manage_guild=True)
+    async def linkforget(self, ctx, domain: str):
+        """Remove a domain from this server's allow and deny lists."""
+        domain = self.edit_link_list(ctx.guild.id, domain, None)
+        await ctx.send(f"`{domain}` removed from the link lists.")
+
+    @commands.command()
+    @commands.has_permissions(manage_messages=True)
+    async def automodstats(self, ctx):
+        """Show AutoMod memory usage."""
+        cooldowns = self.cooldowns.stats()
+        actions = self.executor.stats()
+        images = "off"
+        if self.image_index is not None:
+            images = f"{len(self.image_index)} ({self.image_index.memory_bytes() // 1024} KiB reserved)"
+        await ctx.send(
+            f"Cooldowns: {cooldowns['entries']}/{cooldowns['max_entries']} "
+            f"(expired {cooldowns['expired']}, evicted {cooldowns['evicted']})\n"
+            f"Compiled matchers: {len(self.matchers)}\n"
+            f"Spam tracks: {len(self.spam) if self.spam is not None else 'off'}\n"
+            f"Action queue: {actions['depth']} waiting, {actions['queued']} queued, "
+            f"{actions['coalesced']} coalesced, {actions['dropped']} dropped, {actions['failed']} failed | "
+            f"latency p50 {actions['p50_ms']:.0f}ms p99 {actions['p99_ms']:.0f}ms\n"
+            f"Log digest: {self.digest.pending()} hit(s) pending, {self.digest.flushed} posted\n"
+            f"Image hashes: {images}"
+        )
+
 
-def setup(bot):
-    bot.add_cog(AutoMod(bot))
\ No newline at end of file
+async def setup(bot):
+    await bot.add_cog(AutoMod(bot))
\ No newline at end of file
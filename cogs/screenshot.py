@@ -1,10 +1,21 @@
 import io
+import time
+
 import discord
 from discord.ext import commands
 from discord import app_commands
-from playwright.async_api import async_playwright
+
+from cogs._browser_pool import BrowserPool
+from cogs._screenshot_queue import JobExpired, QuotaExceeded, ScreenshotQueue, interaction_deadline
 
 TEST_GUILD_ID = 1375977504703119430  # Your test server ID
+# Minimum gap between queue position edits on the same reply.
+POSITION_INTERVAL = 2.0
+QUOTA_MESSAGES = {
+    "user": "⏳ You're taking screenshots too quickly. Try again in {:.0f}s.",
+    "guild": "⏳ This server has used up its screenshots for now. Try again in {:.0f}s.",
+    "queue": "⏳ The screenshot queue is full. Try again in {:.0f}s.",
+}
 
 class ScreenshotModal(discord.ui.Modal, title="Enter URL for Screenshot"):
     url = discord.ui.TextInput(
@@ -14,38 +25,87 @@ class ScreenshotModal(discord.ui.Modal, title="Enter URL for Screenshot"):
         max_length=200,
     )
 
-    def __init__(self, bot: commands.Bot, interaction: discord.Interaction):
+    def __init__(self, bot: commands.Bot, interaction: discord.Interaction, browsers: BrowserPool, jobs: ScreenshotQueue):
         super().__init__()
         self.bot = bot
         self.interaction = interaction
+        self.browsers = browsers
+        self.jobs = jobs
+        self.last_update = 0.0
+
+    async def show_position(self, interaction: discord.Interaction, position: int, eta: float):
+        # Each edit is an API call; a busy queue moves faster than that is worth.
+        if position and time.monotonic() - self.last_update < POSITION_INTERVAL:
+            return
+        self.last_update = time.monotonic()
+        if position:
+            content = f"🕒 Queued for a screenshot: position {position}, ready in about {eta:.0f}s."
+        else:
+            content = f"📸 Taking your screenshot, about {eta:.0f}s..."
+        try:
+            await interaction.edit_original_response(content=content)
+        except discord.HTTPException:
+            pass
 
     async def on_submit(self, interaction: discord.Interaction):
-        await interaction.response.defer()
         url = self.url.value
+        try:
+            job = self.jobs.submit(
+                interaction.user.id,
+                interaction.guild_id,
+                lambda: self.browsers.screenshot(url, timeout=15000),
+                interaction_deadline(interaction),
+                on_position=lambda position, eta: self.show_position(interaction, position, eta),
+            )
+        except QuotaExceeded as e:
+            return await interaction.response.send_message(QUOTA_MESSAGES[e.scope].format(e.retry_after), ephemeral=True)
 
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch()
-                page = await browser.new_page()
-                await page.goto(url, timeout=15000)
-                screenshot_bytes = await page.screenshot(full_page=True)
-                await browser.close()
+            # A modal submitted from a slash command has no message of its own;
+            # thinking=True creates the reply that the queue updates edit.
+            await interaction.response.defer(thinking=True)
+        except discord.HTTPException:
+            self.jobs.cancel(job)
+            raise
+        if job.position:
+            await self.show_position(interaction, job.position, self.jobs.eta(job.position))
+
+        try:
+            screenshot_bytes = await job.wait()
 
             file = discord.File(io.BytesIO(screenshot_bytes), filename="screenshot.png")
-            await interaction.followup.send(file=file)
+            await interaction.edit_original_response(content=None, attachments=[file])
+        except JobExpired:
+            await interaction.edit_original_response(content="❌ The screenshot queue is too long right now. Try again in a few minutes.")
         except Exception as e:
-            await interaction.followup.send(f"❌ Failed to take screenshot: {e}")
+            await interaction.edit_original_response(content=f"❌ Failed to take screenshot: {e}")
 
 class Screenshot(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.browsers = BrowserPool()
+        # As many running jobs as the pool allows open contexts.
+        self.jobs = ScreenshotQueue(concurrency=self.browsers.size)
+
+    async def cog_load(self):
+        # Launching Chromium takes a second or two; do it once up front
+        # instead of on every /screenshot.
+        try:
+            await self.browsers.start()
+        except Exception as e:
+            # The pool retries the launch on the first screenshot.
+            print("[Screenshot Error]", e)
+
+    async def cog_unload(self):
+        self.jobs.close()
+        await self.browsers.stop()
 
     @app_commands.command(
         name="screenshot",
         description="Take a screenshot of a webpage",
     )
     async def screenshot(self, interaction: discord.Interaction):
-        modal = ScreenshotModal(self.bot, interaction)
+        modal = ScreenshotModal(self.bot, interaction, self.browsers, self.jobs)
         await interaction.response.send_modal(modal)
 
 async def setup(bot):
@@ -1,17 +1,34 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from PIL import Image, ImageDraw, ImageFont
 from io import BytesIO
 import os
 
+from cogs._avatar_cache import card_avatar
+from cogs._cards import AVATAR_SIZE
+from cogs._mention_index import MentionIndex
+from cogs._render_cache import RenderCache, cache_key
+from cogs._render_service import renderer
+from cogs._templates import templates
+
 TRASH_IMAGE_PATH = "trash-pandemic-covid-19-01.png"  # Make sure this file is present or update path
 OUTPUT_DIR = "trash_shame"  # Folder to save trashed user images
+TRASH_OUTPUT = {"quality": "high", "budget": 8 * 1024 * 1024}
+# Bump when trash_card's layout changes so cached renders aren't reused.
+TRASH_CARD_VERSION = 2
 
 class TrashBot(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         os.makedirs(OUTPUT_DIR, exist_ok=True)
+        self.cache = RenderCache(OUTPUT_DIR)
+        self.mentions = MentionIndex()
+
+    async def cog_load(self):
+        renderer.acquire()
+
+    async def cog_unload(self):
+        renderer.release()
 
     @commands.command(name="trashpile")
     @commands.has_permissions(manage_messages=True)
@@ -32,30 +49,40 @@ class TrashBot(commands.Cog):
         if not interaction.user.guild_permissions.manage_messages:
             await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
             return
+        # Rendering can queue behind other cards; don't let the interaction expire.
+        await interaction.response.defer(thinking=True)
         await self.trash_user(member, interaction.channel, interaction)
     
     @TrashStuffPile.error
     async def TrashStuffPile_error(self, interaction: discord.Interaction, error):
-        await interaction.response.send_message("⚠️ Something went wrong with the slash command.", ephemeral=True)
+        if interaction.response.is_done():
+            await interaction.followup.send("⚠️ Something went wrong with the slash command.", ephemeral=True)
+        else:
+            await interaction.response.send_message("⚠️ Something went wrong with the slash command.", ephemeral=True)
         print("[Slash Trashpile Error]", error)
 
     async def trash_user(self, member: discord.Member, channel: discord.TextChannel, ctx_or_interaction=None):
         try:
-            base = Image.open(TRASH_IMAGE_PATH).convert("RGBA")
-
-            pfp_bytes = await member.display_avatar.read()
-            pfp_img = Image.open(BytesIO(pfp_bytes)).convert("RGBA").resize((200, 200))
-
-            base.paste(pfp_img, (900, 900), pfp_img)
-
-            draw = ImageDraw.Draw(base)
-            font = ImageFont.load_default()
             text = f"🚫 Caught Trashin': {member.name}"
-            draw.text((860, 1120), text, font=font, fill="white")
-
-            file_obj = BytesIO()
-            base.save(file_obj, format="PNG")
-            file_obj.seek(0)
+            key = cache_key(
+                TRASH_CARD_VERSION, TRASH_IMAGE_PATH, templates.version(TRASH_IMAGE_PATH),
+                member.display_avatar.key, text, TRASH_OUTPUT,
+            )
+            cached = await self.cache.get(key)
+            if cached is None:
+                spec = {
+                    "kind": "trash",
+                    "template": TRASH_IMAGE_PATH,
+                    "lines": [text],
+                    "output": TRASH_OUTPUT,
+                    **await card_avatar(member.display_avatar, AVATAR_SIZE),
+                }
+                encoded = await renderer.render(spec)
+                cached = encoded.data, encoded.extension
+                await self.cache.put(key, *cached)
+            data, ext = cached
+            file_obj = BytesIO(data)
+            filename = f"{member.id}_trash.{ext}"
 
             embed = discord.Embed(
                 title="🗑️ User Trashed!",
@@ -64,13 +91,13 @@ class TrashBot(commands.Cog):
             )
 
             if ctx_or_interaction is None:
-                await channel.send(embed=embed, file=discord.File(file_obj, filename=f"{member.id}_trash.png"))
+                await channel.send(embed=embed, file=discord.File(file_obj, filename=filename))
             else:
                 # Check if ctx_or_interaction is commands.Context or discord.Interaction
                 if isinstance(ctx_or_interaction, commands.Context):
-                    await ctx_or_interaction.send(embed=embed, file=discord.File(file_obj, filename=f"{member.id}_trash.png"))
+                    await ctx_or_interaction.send(embed=embed, file=discord.File(file_obj, filename=filename))
                 else:
-                    await ctx_or_interaction.response.send_message(embed=embed, file=discord.File(file_obj, filename=f"{member.id}_trash.png"))
+                    await ctx_or_interaction.followup.send(embed=embed, file=discord.File(file_obj, filename=filename))
 
         except Exception as e:
             if ctx_or_interaction is None:
@@ -79,20 +106,56 @@ class TrashBot(commands.Cog):
                 if isinstance(ctx_or_interaction, commands.Context):
                     await ctx_or_interaction.send("⚠️ Something went wrong trashing the user.")
                 else:
-                    await ctx_or_interaction.response.send_message("⚠️ Something went wrong trashing the user.", ephemeral=True)
+                    await ctx_or_interaction.followup.send("⚠️ Something went wrong trashing the user.", ephemeral=True)
             print("[TrashUser Error]", e)
 
     @commands.Cog.listener()
-    async def on_message_delete(self, message):
-        if message.author.bot:
+    async def on_message(self, message):
+        if message.author.bot or not message.mentions:
+            return
+        self.mentions.add(
+            message.id,
+            message.channel.id,
+            message.guild.id if message.guild else None,
+            message.author.id,
+            [user.id for user in message.mentions],
+        )
+
+    async def ghost_ping(self, record):
+        channel = self.bot.get_channel(record.channel_id)
+        if channel is None:
             return
-        if message.mentions:
-            mentioned_users = ", ".join(user.mention for user in message.mentions)
-            await message.channel.send(f"👻 Ghost ping detected! {message.author.mention} mentioned {mentioned_users} and deleted the message.")
-            await self.trash_user(message.author, message.channel)
+        author = None
+        guild = self.bot.get_guild(record.guild_id) if record.guild_id else None
+        if guild is not None:
+            author = guild.get_member(record.author_id)
+            if author is None:
+                try:
+                    author = await guild.fetch_member(record.author_id)
+                except discord.HTTPException:
+                    pass
+        mentioned_users = ", ".join(f"<@{user_id}>" for user_id in record.mentions)
+        await channel.send(f"👻 Ghost ping detected! <@{record.author_id}> mentioned {mentioned_users} and deleted the message.")
+        if author is not None:
+            await self.trash_user(author, channel)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        record = self.mentions.pop(payload.message_id)
+        if record is not None:
+            await self.ghost_ping(record)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        # One report per author, not one per message in the purge.
+        records = {}
+        for message_id in payload.message_ids:
+            record = self.mentions.pop(message_id)
+            if record is not None:
+                records.setdefault(record.author_id, record)
+        for record in records.values():
+            await self.ghost_ping(record)
 
 async def setup(bot):
-    cog = TrashBot(bot)
-    await bot.add_cog(cog)
-    # Register slash command globally
-    bot.tree.add_command(cog.TrashStuffPile)
+    # add_cog registers the /trashpile slash command along with the cog.
+    await bot.add_cog(TrashBot(bot))
@@ -2,13 +2,21 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from discord.ui import View, Select
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
 from io import BytesIO
+import asyncio
 import json
 import os
 
+from cogs._avatar_cache import avatars, card_avatar
+from cogs._cards import AVATAR_SIZE, COLLAGE_TILE
+from cogs._invite_tracker import InviteTracker
+from cogs._join_burst import JoinBurst
+from cogs._render_service import renderer
+
 CONFIG_FILE = "welcome_config.json"
 WELCOME_IMAGE_PATH = "Assets/WelcomeTrash.png"
+WELCOME_FONT_PATH = "Assets/arial.ttf"
+WELCOME_OUTPUT = {"quality": "high", "budget": 8 * 1024 * 1024}
 
 # Ensure config file exists
 if not os.path.exists(CONFIG_FILE):
@@ -23,42 +31,6 @@ def save_config(data):
     with open(CONFIG_FILE, "w") as f:
         json.dump(data, f, indent=4)
 
-def get_text_size(font, text):
-    bbox = font.getbbox(text)
-    width = bbox[2] - bbox[0]
-    height = bbox[3] - bbox[1]
-    return width, height
-
-def draw_text_with_background(draw, position, text, font, padding=10):
-    text_width, text_height = get_text_size(font, text)
-    x, y = position
-
-    bg_x0 = x - padding
-    bg_y0 = y - padding
-    bg_x1 = x + text_width + padding
-    bg_y1 = y + text_height + padding
-
-    temp_img = Image.new("RGBA", (bg_x1 - bg_x0, bg_y1 - bg_y0), (0, 0, 0, 0))
-    temp_draw = ImageDraw.Draw(temp_img)
-
-    radius = padding
-    # Draw rounded red background
-    temp_draw.ellipse((0, 0, radius*2, radius*2), fill=(255, 0, 0, 255))
-    temp_draw.ellipse((temp_img.width - radius*2, 0, temp_img.width, radius*2), fill=(255, 0, 0, 255))
-    temp_draw.ellipse((0, temp_img.height - radius*2, radius*2, temp_img.height), fill=(255, 0, 0, 255))
-    temp_draw.ellipse((temp_img.width - radius*2, temp_img.height - radius*2, temp_img.width, temp_img.height), fill=(255, 0, 0, 255))
-
-    temp_draw.rectangle([radius, 0, temp_img.width - radius, temp_img.height], fill=(255, 0, 0, 255))
-    temp_draw.rectangle([0, radius, temp_img.width, temp_img.height - radius], fill=(255, 0, 0, 255))
-
-    outline_img = temp_img.filter(ImageFilter.MaxFilter(5))
-    # Paste outline behind
-    draw.bitmap((bg_x0, bg_y0), outline_img, fill=None)
-    # Paste background
-    draw.bitmap((bg_x0, bg_y0), temp_img, fill=None)
-    # Draw text on top
-    draw.text((x, y), text, font=font, fill="black")
-
 class ChannelDropdown(Select):
     def __init__(self, bot, guild):
         options = [
@@ -88,6 +60,61 @@ class SetupWelcomeView(View):
 class WelcomeCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.invites = InviteTracker()
+        self.bursts = JoinBurst(self.send_collage)
+
+    async def cog_load(self):
+        renderer.acquire()
+        if self.bot.is_ready():
+            asyncio.create_task(self.snapshot_invites())
+
+    async def cog_unload(self):
+        renderer.release()
+
+    async def render_card(self, member, welcome_text, invite_info):
+        """Render the welcome card off the event loop and return it encoded."""
+        spec = {
+            "kind": "welcome",
+            "template": WELCOME_IMAGE_PATH,
+            "font": WELCOME_FONT_PATH,
+            "lines": [welcome_text, invite_info],
+            "output": WELCOME_OUTPUT,
+            **await card_avatar(member.display_avatar, AVATAR_SIZE),
+        }
+        return await renderer.render(spec)
+
+    async def send_collage(self, guild, members):
+        """Welcome a whole join burst with one grid card and one message."""
+        guild_conf = load_config().get(str(guild.id))
+        channel = guild.get_channel(guild_conf["welcome_channel"]) if guild_conf else None
+        if not channel:
+            return
+
+        images = await asyncio.gather(*(avatars.get(m.display_avatar, COLLAGE_TILE) for m in members))
+        spec = {
+            "kind": "collage",
+            "template": WELCOME_IMAGE_PATH,
+            "font": WELCOME_FONT_PATH,
+            "avatars": list(images),
+            "lines": [f"Welcome to {guild.name}, all {len(members)} of you!"],
+            "output": WELCOME_OUTPUT,
+        }
+        card = await renderer.render(spec)
+
+        mentions = []
+        length = 0
+        for member in members:
+            length += len(member.mention) + 1
+            if length > 1800:
+                mentions.append(f"and {len(members) - len(mentions)} more")
+                break
+            mentions.append(member.mention)
+        await channel.send(
+            content=f"Welcome {' '.join(mentions)}! 🗑️",
+            file=discord.File(BytesIO(card.data), filename=card.filename("welcome")),
+            # A raid shouldn't turn into a mass ping.
+            allowed_mentions=discord.AllowedMentions.none(),
+        )
 
     @app_commands.command(name="welcomesetup", description="Set the welcome channel")
     @app_commands.checks.has_permissions(administrator=True)
@@ -106,6 +133,34 @@ class WelcomeCog(commands.Cog):
         else:
             await interaction.response.send_message("⚠️ An error occurred.", ephemeral=True)
 
+    async def snapshot_invites(self):
+        """Take invite snapshots for every guild with a welcome channel."""
+        config = load_config()
+        for guild in self.bot.guilds:
+            if str(guild.id) in config:
+                try:
+                    await self.invites.snapshot(guild)
+                except Exception as e:
+                    print("[Invite Snapshot Error]", e)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        await self.snapshot_invites()
+
+    @commands.Cog.listener()
+    async def on_invite_create(self, invite):
+        if invite.guild is not None:
+            self.invites.on_create(invite)
+
+    @commands.Cog.listener()
+    async def on_invite_delete(self, invite):
+        if invite.guild is not None:
+            self.invites.on_delete(invite)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.invites.forget(guild.id)
+
     @commands.Cog.listener()
     async def on_member_join(self, member):
         config = load_config()
@@ -117,39 +172,19 @@ class WelcomeCog(commands.Cog):
         if not channel:
             return
 
-        try:
-            base = Image.open(WELCOME_IMAGE_PATH).convert("RGBA")
-
-            avatar_bytes = await member.display_avatar.read()
-            avatar_img = Image.open(BytesIO(avatar_bytes)).convert("RGBA").resize((200, 200))
-
-            outline = Image.new("RGBA", (210, 210), (0, 0, 0, 255))
-            outline.paste(avatar_img, (5, 5), avatar_img)
-            base.paste(outline, (30, 180), outline)
+        if self.bursts.add(member):
+            return  # welcomed in the next collage instead
 
-            draw = ImageDraw.Draw(base)
-            font = ImageFont.truetype("arial.ttf", 40)
+        try:
+            invite_info = "Invited by unknown"
+            used = await self.invites.find_invite(member)
+            if used is not None and used.inviter:
+                invite_info = f"Invited by {used.inviter} | Link used {used.uses} times"
 
             welcome_text = f"Welcome to {member.guild.name}!\nGet trashed soon."
-            draw_text_with_background(draw, (260, 200), welcome_text, font)
+            card = await self.render_card(member, welcome_text, invite_info)
 
-            invite_info = "Invited by unknown"
-            try:
-                invites = await member.guild.invites()
-                for inv in invites:
-                    if inv.inviter and inv.uses:
-                        invite_info = f"Invited by {inv.inviter.name} | Link used {inv.uses} times"
-                        break
-            except:
-                pass
-
-            draw_text_with_background(draw, (30, 350), invite_info, font)
-
-            buffer = BytesIO()
-            base.save(buffer, format="PNG")
-            buffer.seek(0)
-
-            file = discord.File(buffer, filename="welcome.png")
+            file = discord.File(BytesIO(card.data), filename=card.filename("welcome"))
             await channel.send(content=f"Welcome {member.mention}! 🗑️", file=file)
 
         except Exception as e:
@@ -173,36 +208,39 @@ class WelcomeCog(commands.Cog):
             return
 
         try:
-            base = Image.open(WELCOME_IMAGE_PATH).convert("RGBA")
-
-            avatar_bytes = await member.display_avatar.read()
-            avatar_img = Image.open(BytesIO(avatar_bytes)).convert("RGBA").resize((200, 200))
-
-            outline = Image.new("RGBA", (210, 210), (0, 0, 0, 255))
-            outline.paste(avatar_img, (5, 5), avatar_img)
-            base.paste(outline, (30, 180), outline)
-
-            draw = ImageDraw.Draw(base)
-            font = ImageFont.truetype("arial.ttf", 40)
-
+            # Rendering can queue behind other cards; don't let the interaction expire.
+            await interaction.response.defer(ephemeral=True, thinking=True)
             welcome_text = f"Welcome to {interaction.guild.name}!\nGet trashed soon."
-            draw_text_with_background(draw, (260, 200), welcome_text, font)
+            card = await self.render_card(member, welcome_text, "Invited by unknown")
 
-            invite_info = "Invited by unknown"
-            draw_text_with_background(draw, (30, 350), invite_info, font)
-
-            buffer = BytesIO()
-            base.save(buffer, format="PNG")
-            buffer.seek(0)
-
-            file = discord.File(buffer, filename="welcome.png")
+            file = discord.File(BytesIO(card.data), filename=card.filename("welcome"))
             await channel.send(content=f"Welcome {member.mention}! 🗑️ (Test welcome)", file=file)
 
-            await interaction.response.send_message(f"✅ Sent test welcome message in {channel.mention}", ephemeral=True)
+            await interaction.followup.send(f"✅ Sent test welcome message in {channel.mention}", ephemeral=True)
 
         except Exception as e:
             print("[Test Welcome Error]", e)
-            await interaction.response.send_message(f"❌ Failed to send test welcome: {e}", ephemeral=True)
+            await interaction.followup.send(f"❌ Failed to send test welcome: {e}", ephemeral=True)
+
+    @commands.command(name="renderstats")
+    @commands.is_owner()
+    async def renderstats(self, ctx):
+        """Show card rendering timings and avatar cache stats"""
+        stats = renderer.stats()
+        cache = avatars.stats()
+        await ctx.send(
+            f"🖼️ Rendered {stats['rendered']} card(s), {stats['failed']} failed, "
+            f"{stats['in_flight']} in flight on {stats['workers']} worker(s) "
+            f"({stats['waited']} waited for a slot)\n"
+            f"Render p50/p99: {stats['render_p50_ms']:.1f}/{stats['render_p99_ms']:.1f} ms, "
+            f"end-to-end p50/p99: {stats['total_p50_ms']:.1f}/{stats['total_p99_ms']:.1f} ms\n"
+            f"Encode p50/p99: {stats['encode_p50_ms']:.1f}/{stats['encode_p99_ms']:.1f} ms, "
+            f"{stats['bytes_out'] / 1024:.0f} KiB sent, {stats['bytes_saved'] / 1024:.0f} KiB saved vs plain PNG "
+            f"({', '.join(f'{k}: {v}' for k, v in stats['formats'].items()) or 'nothing yet'})\n"
+            f"Avatars: {cache['entries']} cached ({cache['bytes'] / 1024 / 1024:.1f} MiB), "
+            f"{cache['hits']} hits, {cache['disk_hits']} disk hits, {cache['downloads']} downloads, "
+            f"{cache['shared']} shared in-flight"
+        )
 
 async def setup(bot):
     await bot.add_cog(WelcomeCog(bot))